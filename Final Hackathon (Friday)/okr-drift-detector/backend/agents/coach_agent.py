@@ -1,14 +1,19 @@
-from utils.rag_utils import GeminiRAGUtils
+from utils.rag_utils import GeminiRAGUtils, get_rag_utils
 from utils.tavily_client import TavilySearch
+import asyncio
 import json
+import os
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import re
 
 class CoachingAgent:
-    def __init__(self):
-        self.rag_utils = GeminiRAGUtils()
-        self.tavily_client = TavilySearch()
+    def __init__(self, rag_utils: Optional[GeminiRAGUtils] = None,
+                 tavily_client: Optional[TavilySearch] = None):
+        self.rag_utils = rag_utils or get_rag_utils()
+        self.tavily_client = tavily_client or TavilySearch()
+        # Maximum number of Tavily searches in flight for one coaching plan
+        self.search_concurrency = int(os.getenv("COACHING_SEARCH_CONCURRENCY", "5"))
         self.pillar_okrs = {
             "CLT": ["Value Added Course"],
             "CFC": ["Hackathon", "BMC Video Analysis", "Project"],
@@ -17,7 +22,8 @@ class CoachingAgent:
             "SRI": ["DT Engagement Activity"]
         }
     
-    async def _get_goal_specific_recommendations(self, goal: str, pillar: str, okr_type: str, month: int) -> List[Dict[str, str]]:
+    async def _get_goal_specific_recommendations(self, goal: str, pillar: str, okr_type: str, month: int,
+                                                 use_cache: bool = True) -> List[Dict[str, str]]:
         """Get specific recommendations based on goal, pillar, OKR type and month"""
         queries = {
             "CLT": {
@@ -76,10 +82,10 @@ class CoachingAgent:
         if not query:
             return []
             
-        results = await self.tavily_client.search(query, max_results=3)
+        results = await self.tavily_client.search(query, max_results=3, use_cache=use_cache)
         return results
 
-    async def _generate_project_ideas(self, goal: str, level: str) -> List[str]:
+    async def _generate_project_ideas(self, goal: str, level: str, use_cache: bool = True) -> List[str]:
         """Generate project ideas based on goal and level"""
         prompt = f"""
         Generate 3 project ideas for a {level} level student aiming to become {goal}.
@@ -100,18 +106,28 @@ class CoachingAgent:
            - Potential Impact:
         """
         
-        response = await self.rag_utils.generate_with_context(prompt)
+        response = await self.rag_utils.generate_with_context(prompt, use_cache=use_cache)
         return response.split('\n')
 
     async def generate_coaching(self, pattern: str, drift_report: Dict[str, Any], 
                           trajectory: str, quarterly_goal: str = None,
-                          current_level: str = "beginner") -> Dict[str, Any]:
-        """Generate coaching with proper parameter defaults"""
+                          current_level: str = "beginner",
+                          prefetched: Optional[Dict[str, Any]] = None,
+                          use_cache: bool = True) -> Dict[str, Any]:
+        """Generate coaching with proper parameter defaults.
+
+        ``prefetched`` is the output of prefetch_recommendations for the same goal and
+        level; when omitted the searches are run here.
+        """
         if not quarterly_goal:
             quarterly_goal = "career development"
             print("⚠️ No quarterly goal provided, using default")
-        quarterly_plan = {}
+        if prefetched is None:
+            prefetched = await self.prefetch_recommendations(quarterly_goal, current_level, use_cache)
+        recommendations = prefetched["recommendations"]
+        project_ideas = prefetched["project_ideas"]
         
+        quarterly_plan = {}
         for month in range(1, 4):
             monthly_plan = {}
             for pillar, okr_types in self.pillar_okrs.items():
@@ -120,16 +136,13 @@ class CoachingAgent:
                     if okr_type == "Project" and month == 1:
                         # Only generate project ideas in month 1
                         if pillar == "CFC":
-                            project_ideas = await self._generate_project_ideas(quarterly_goal, current_level)
                             pillar_plan[okr_type] = {
                                 "ideas": project_ideas,
                                 "action": self._get_okr_action(pillar, okr_type, month)
                             }
                     else:
-                        recommendations = await self._get_goal_specific_recommendations(
-                            quarterly_goal, pillar, okr_type, month
-                        )
-                        if recommendations:
+                        results = recommendations[self._slot_key(month, pillar, okr_type)]
+                        if results:
                             pillar_plan[okr_type] = {
                                 "recommendations": [
                                     {
@@ -137,7 +150,7 @@ class CoachingAgent:
                                         "url": rec.get("url", ""),
                                         "description": rec.get("content", "")[:200] + "..."
                                     }
-                                    for rec in recommendations
+                                    for rec in results
                                 ],
                                 "action": self._get_okr_action(pillar, okr_type, month),
                                 "success_metrics": self._get_success_metrics(pillar, okr_type, month)
@@ -151,6 +164,45 @@ class CoachingAgent:
             "cross_pillar_synergies": self._generate_cross_pillar_synergies(quarterly_goal)
         }
 
+    async def prefetch_recommendations(self, quarterly_goal: str, current_level: str = "beginner",
+                                       use_cache: bool = True) -> Dict[str, Any]:
+        """Run every roadmap search (and the project idea generation) concurrently.
+
+        Depends only on the goal and level, so it can run alongside the drift analysis.
+        Returns search results keyed by "month:pillar:okr_type" plus the project ideas.
+        """
+        if not quarterly_goal:
+            quarterly_goal = "career development"
+        semaphore = asyncio.Semaphore(max(1, self.search_concurrency))
+        
+        async def search(pillar: str, okr_type: str, month: int) -> List[Dict]:
+            async with semaphore:
+                return await self._get_goal_specific_recommendations(
+                    quarterly_goal, pillar, okr_type, month, use_cache
+                )
+        
+        slots = [
+            (month, pillar, okr_type)
+            for month in range(1, 4)
+            for pillar, okr_types in self.pillar_okrs.items()
+            for okr_type in okr_types
+            if not (okr_type == "Project" and month == 1)
+        ]
+        project_ideas, *results = await asyncio.gather(
+            self._generate_project_ideas(quarterly_goal, current_level, use_cache),
+            *(search(pillar, okr_type, month) for month, pillar, okr_type in slots)
+        )
+        return {
+            "recommendations": {
+                self._slot_key(*slot): result for slot, result in zip(slots, results)
+            },
+            "project_ideas": project_ideas
+        }
+
+    @staticmethod
+    def _slot_key(month: int, pillar: str, okr_type: str) -> str:
+        return f"{month}:{pillar}:{okr_type}"
+
     def _get_okr_action(self, pillar: str, okr_type: str, month: int) -> str:
         """Get specific action items for each OKR type"""
         actions = {
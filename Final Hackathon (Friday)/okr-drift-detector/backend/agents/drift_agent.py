@@ -1,37 +1,48 @@
-from utils.rag_utils import GeminiRAGUtils
+from utils.rag_utils import GeminiRAGUtils, get_rag_utils
+from utils.prompt_builder import PromptBuilder
 import json
 from typing import Dict, Any, List, Optional
-from datetime import datetime
 
 class DriftDetectorAgent:
-    def __init__(self):
-        self.rag_utils = GeminiRAGUtils()
+    # Static knowledge base queries for typical progression patterns
+    CONTEXT_QUERIES = [
+        "typical student progression patterns in 5-pillar framework",
+        "coherent skill development pathways in OKR system",
+        "common goal drift patterns in student OKRs"
+    ]
+    CONTEXT_CACHE_KEY = "drift_framework_context"
+    # Reasoning of the fallback report returned when the model's JSON can't be parsed
+    PARSE_FAILED_REASONING = "Analysis completed but parsing failed"
+
+    def __init__(self, rag_utils: Optional[GeminiRAGUtils] = None):
+        self.rag_utils = rag_utils or get_rag_utils()
+        self.prompt_builder = PromptBuilder()
+    
+    async def get_framework_context(self) -> List[Dict]:
+        """Framework context across all pillars, cached until the knowledge base changes"""
+        contexts = await self.rag_utils.aget_cached_contexts(
+            self.CONTEXT_CACHE_KEY,
+            [
+                (pillar, query, 2)
+                for query in self.CONTEXT_QUERIES
+                for pillar in ["CLT", "CFC", "SCD", "IIPC", "SRI"]
+            ]
+        )
+        return self.prompt_builder.select_contexts(contexts)
     
-    async def detect_drift(self, trajectory_summary: str, okr_data: Dict[str, Any], quarterly_goal: str) -> Dict[str, Any]:
+    async def detect_drift(self, trajectory_summary: str, okr_data: Dict[str, Any], quarterly_goal: str,
+                           use_cache: bool = True) -> Dict[str, Any]:
         """Detect goal drift relative to quarterly goal using RAG for context"""
         
-        # Query knowledge base for typical progression patterns
-        context_queries = [
-            "typical student progression patterns in 5-pillar framework",
-            "coherent skill development pathways in OKR system",
-            "common goal drift patterns in student OKRs"
-        ]
-        
-        all_contexts = []
-        for query in context_queries:
-            # Query across all pillars for comprehensive context
-            for pillar in ["CLT", "CFC", "SCD", "IIPC", "SRI"]:
-                context = self.rag_utils.query_pillar_knowledge(pillar, query, k=2)
-                all_contexts.extend(context)
-        
-        # Create a serializable version of the data
-        serializable_data = self._make_serializable(okr_data)
+        # Precomputed at startup; only re-queried after a knowledge base change
+        all_contexts = await self.get_framework_context()
         
         prompt = f"""
         Analyze the student's OKR progression for goal drift patterns specifically in context of: {quarterly_goal}.
         
         Trajectory Summary: {trajectory_summary}
-        OKR Data: {json.dumps(serializable_data, indent=2)}
+        OKR History (newest first):
+        {self.prompt_builder.format_history(okr_data.get("okrs", []))}
         
         5-Pillar Framework Context:
         - CLT: Should show progressive learning (basic → advanced courses)
@@ -69,7 +80,7 @@ class DriftDetectorAgent:
         Each flagged_transition should include: {{"from": "", "to": "", "reason": "", "suggested_action": ""}}
         """
         
-        response = await self.rag_utils.generate_with_context(prompt, all_contexts)
+        response = await self.rag_utils.generate_with_context(prompt, all_contexts, use_cache=use_cache)
         
         try:
             # Extract JSON from response
@@ -84,17 +95,5 @@ class DriftDetectorAgent:
         return {
             "drift_level": "Medium", 
             "flagged_transitions": [], 
-            "reasoning": "Analysis completed but parsing failed"
+            "reasoning": self.PARSE_FAILED_REASONING
         }
-
-    def _make_serializable(self, data: Any) -> Any:
-        """Recursively convert datetime objects to strings"""
-        if isinstance(data, dict):
-            return {k: self._make_serializable(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self._make_serializable(item) for item in data]
-        elif isinstance(data, datetime):
-            return data.isoformat()
-        elif hasattr(data, '__dict__'):
-            return self._make_serializable(data.__dict__)
-        return data
\ No newline at end of file
@@ -1,13 +1,18 @@
 from typing import Dict, List, Any
-from models.okr_model import okr_submissions, okr_definitions, pillars, student_collection
-from utils.rag_utils import GeminiRAGUtils
+from models.okr_model import (
+    okr_submissions, okr_definitions, pillars, student_collection,
+    okr_definition_cache, pillar_cache
+)
+from utils.rag_utils import GeminiRAGUtils, get_rag_utils
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from termcolor import colored 
+from bson import json_util
+import hashlib
 
 class OKRExtractorAgent:
-    def __init__(self):
-        self.rag_utils = GeminiRAGUtils()
+    def __init__(self, rag_utils: Optional[GeminiRAGUtils] = None):
+        self.rag_utils = rag_utils or get_rag_utils()
     
     async def extract_past_okrs(self, student_id: int, cycles: int = 3) -> Dict[str, Any]:
         """Extract OKRs from the last N cycles using RAG for context"""
@@ -21,71 +26,58 @@ class OKRExtractorAgent:
         
         print(colored(f"  - Student: {student['name']} ({student['registerNumber']})", "blue"))
         
-        # Get distinct months from submissions
-        print(colored("  - Querying distinct months...", "blue"))
-        distinct_months = await okr_submissions.distinct(
-            "monthId",
-            {"studentId": student_id, "isActive": True, "isDeleted": False}
+        # Single round trip: last N months of submissions. Definitions and pillars come from
+        # the in-process reference caches, or are joined in the pipeline when caching is off
+        use_cache = okr_definition_cache.enabled and pillar_cache.enabled
+        print(colored("  - Running extraction pipeline...", "blue"))
+        cursor = okr_submissions.aggregate(
+            self.build_extraction_pipeline(student_id, cycles, with_lookups=not use_cache)
         )
+        submissions = await cursor.to_list(length=None)
         
-        if not distinct_months:
+        if not submissions:
             print(colored("  - No submissions found, using sample data", "yellow"))
             return await self._generate_sample_okrs(student_id, student)
         
-        # Sort months and get last N cycles
-        distinct_months.sort(reverse=True)
-        last_n_months = distinct_months[:cycles]
-        print(colored(f"  - Analyzing months: {', '.join(last_n_months)}", "blue"))
-        
-        # Query submissions for these months
-        print(colored("  - Fetching submissions...", "blue"))
-        cursor = okr_submissions.find({
-            "studentId": student_id,
-            "monthId": {"$in": last_n_months},
-            "isActive": True,
-            "isDeleted": False
-        }).sort("monthId", -1)
+        if use_cache:
+            await self._enrich_from_cache(submissions)
         
-        submissions = await cursor.to_list(length=None)
+        months = list(dict.fromkeys(submission["monthId"] for submission in submissions))
+        print(colored(f"  - Analyzing months: {', '.join(months)}", "blue"))
         print(colored(f"  - Found {len(submissions)} submissions", "green"))
         
-        # Get related OKR definitions and pillars
+        # Format for analysis
         enriched_okrs = []
         print(colored("  - Enriching with OKR definitions...", "blue"))
         
         for submission in submissions:
-            okr_def = await okr_definitions.find_one({"_id": submission["okrId"]})
-            pillar = await pillars.find_one({"_id": submission["pillarId"]})
-            
-            if not okr_def or not pillar:
+            if not submission.get("title") or not submission.get("pillar"):
                 print(colored(f"  - Warning: Missing definition for OKR {submission['okrId']}", "yellow"))
                 continue
-                
-            # Use RAG to enrich OKR context
-            context = self.rag_utils.query_pillar_knowledge(
-                pillar["pillarName"], 
-                okr_def["title"],
-                k=3
-            )
             
-            # Format for analysis
             okr_data = {
                 "monthId": submission["monthId"],
-                "pillar": pillar["pillarName"],
-                "title": okr_def["title"],
-                "description": okr_def["description"],
+                "pillar": submission["pillar"],
+                "title": submission["title"],
+                "description": submission["description"],
                 "activities": submission["activity"],
                 "status": submission["status"],
                 "submittedOn": submission.get("submittedOn"),
                 "metadata": {
-                    "okrType": okr_def["okrType"],
-                    "isGroup": okr_def.get("isGroup", False),
-                    "instructions": okr_def.get("instructions", [])
-                },
-                "context": context
+                    "okrType": submission["okrType"],
+                    "isGroup": submission.get("isGroup", False),
+                    "instructions": submission.get("instructions", [])
+                }
             }
             enriched_okrs.append(okr_data)
         
+        # Use RAG to enrich OKR context, batched per pillar
+        contexts = await self.rag_utils.aquery_many([
+            (okr["pillar"], okr["title"], 3) for okr in enriched_okrs
+        ])
+        for okr, context in zip(enriched_okrs, contexts):
+            okr["context"] = context
+        
         print(colored(f"✅ Successfully extracted {len(enriched_okrs)} enriched OKRs", "green"))
         return {
             "okrs": enriched_okrs,
@@ -96,30 +88,141 @@ class OKRExtractorAgent:
             }
         }
     
-async def _generate_sample_okrs(self, student_id: int, student: Dict) -> List[Dict]:
-    """Generate sample OKRs based on 5-pillar framework"""
-    print(colored("⚠️ Using sample OKR data", "yellow"))
-    sample_okrs = [
-        {
-            "monthId": "2025-05",
-            "pillar": "CLT",
-            "title": "Value added course",
-            "description": "GenAI course completion",
-            "activities": [{"certificate": "https://certs.com/sample-cert"}],
-            "status": "completed",
-            "submittedOn": datetime.now() - timedelta(days=30),
-            "metadata": {
-                "okrType": "monthly",
-                "isGroup": False
+    async def compute_source_fingerprint(self, student_id: int) -> str:
+        """Hash of what extraction depends on: the student's active submissions, the OKR
+        definitions and pillars they reference, and the knowledge base version used to
+        enrich them"""
+        cursor = okr_submissions.find(
+            {"studentId": student_id, "isActive": True, "isDeleted": False},
+            {"okrId": 1, "pillarId": 1, "monthId": 1, "activity": 1, "status": 1, "submittedOn": 1}
+        )
+        submissions = await cursor.to_list(length=None)
+        # Ordered here rather than by the server: a sort on _id can't use the
+        # student_active_month index and would be a blocking in-memory SORT
+        submissions.sort(key=lambda submission: submission["_id"])
+        
+        payload = json_util.dumps({
+            "submissions": submissions,
+            "okr_definitions": await okr_definition_cache.version(s["okrId"] for s in submissions),
+            "pillars": await pillar_cache.version(s["pillarId"] for s in submissions),
+            "kb_version": self.rag_utils.kb_version
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def analysis_fingerprint(source_fingerprint: str, quarterly_goal: str, current_level: str) -> str:
+        """Hash of everything a full analysis depends on: the source data plus goal and level"""
+        payload = json_util.dumps([source_fingerprint, quarterly_goal, current_level])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    async def _enrich_from_cache(self, submissions: List[Dict[str, Any]]):
+        """Fill definition and pillar fields in place from the reference caches"""
+        definitions = await okr_definition_cache.get_many(s["okrId"] for s in submissions)
+        pillar_docs = await pillar_cache.get_many(s["pillarId"] for s in submissions)
+        
+        for submission in submissions:
+            okr_def = definitions.get(submission["okrId"])
+            pillar = pillar_docs.get(submission["pillarId"])
+            if not okr_def or not pillar:
+                continue
+            submission.update({
+                "pillar": pillar["pillarName"],
+                "title": okr_def["title"],
+                "description": okr_def["description"],
+                "okrType": okr_def["okrType"],
+                "isGroup": okr_def.get("isGroup", False),
+                "instructions": okr_def.get("instructions", [])
+            })
+    
+    def build_extraction_pipeline(self, student_id: int, cycles: int,
+                                   with_lookups: bool = True) -> List[Dict[str, Any]]:
+        """Aggregation pipeline returning the student's submissions for the last N months,
+        optionally joined with their OKR definition and pillar, projected to the fields we use"""
+        pipeline = [
+            {"$match": {"studentId": student_id, "isActive": True, "isDeleted": False}},
+            {"$sort": {"monthId": -1}},
+            # Month windowing: keep only the most recent N distinct monthIds
+            {"$group": {
+                "_id": "$monthId",
+                "submissions": {"$push": {
+                    "okrId": "$okrId",
+                    "pillarId": "$pillarId",
+                    "activity": "$activity",
+                    "status": "$status",
+                    "submittedOn": "$submittedOn"
+                }}
+            }},
+            {"$sort": {"_id": -1}},
+            {"$limit": cycles},
+            {"$unwind": "$submissions"},
+            {"$replaceRoot": {"newRoot": {"$mergeObjects": ["$submissions", {"monthId": "$_id"}]}}}
+        ]
+        if not with_lookups:
+            return pipeline + [{"$project": {
+                "_id": 0,
+                "monthId": 1,
+                "okrId": 1,
+                "pillarId": 1,
+                "activity": 1,
+                "status": 1,
+                "submittedOn": 1
+            }}]
+        
+        return pipeline + [
+            {"$lookup": {
+                "from": okr_definitions.name,
+                "localField": "okrId",
+                "foreignField": "_id",
+                "as": "okr_def"
+            }},
+            {"$unwind": {"path": "$okr_def", "preserveNullAndEmptyArrays": True}},
+            {"$lookup": {
+                "from": pillars.name,
+                "localField": "pillarId",
+                "foreignField": "_id",
+                "as": "pillar_doc"
+            }},
+            {"$unwind": {"path": "$pillar_doc", "preserveNullAndEmptyArrays": True}},
+            {"$project": {
+                "_id": 0,
+                "monthId": 1,
+                "okrId": 1,
+                "activity": 1,
+                "status": 1,
+                "submittedOn": 1,
+                "pillar": "$pillar_doc.pillarName",
+                "title": "$okr_def.title",
+                "description": "$okr_def.description",
+                "okrType": "$okr_def.okrType",
+                "isGroup": "$okr_def.isGroup",
+                "instructions": "$okr_def.instructions"
+            }}
+        ]
+    
+    async def _generate_sample_okrs(self, student_id: int, student: Dict) -> Dict[str, Any]:
+        """Generate sample OKRs based on 5-pillar framework"""
+        print(colored("⚠️ Using sample OKR data", "yellow"))
+        sample_okrs = [
+            {
+                "monthId": "2025-05",
+                "pillar": "CLT",
+                "title": "Value added course",
+                "description": "GenAI course completion",
+                "activities": [{"certificate": "https://certs.com/sample-cert"}],
+                "status": "completed",
+                "submittedOn": datetime.now() - timedelta(days=30),
+                "metadata": {
+                    "okrType": "monthly",
+                    "isGroup": False
+                }
             }
-        }
-    ]
+        ]
     
-    return {
-        "okrs": sample_okrs,
-        "student_info": {
-            "name": student.get("name", f"Student {student_id}"),
-            "register_number": str(student.get("registerNumber", "")),  # Ensure string type
-            "department": student.get("department", "")
-        }
-    }
\ No newline at end of file
+        return {
+            "okrs": sample_okrs,
+            "student_info": {
+                "name": student.get("name", f"Student {student_id}"),
+                "register_number": str(student.get("registerNumber", "")),  # Ensure string type
+                "department": student.get("department", "")
+            }
+        }
\ No newline at end of file
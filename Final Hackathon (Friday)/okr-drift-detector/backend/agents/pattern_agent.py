@@ -1,16 +1,28 @@
-from utils.rag_utils import GeminiRAGUtils
+from utils.rag_utils import GeminiRAGUtils, get_rag_utils
 import json
 from typing import Dict, Any, List, Optional
 
 class PatternClassifierAgent:
-    def __init__(self):
-        self.rag_utils = GeminiRAGUtils()
+    # The reference patterns offered to the model in classify_patterns
+    PATTERNS = [
+        "Shiny Object Syndrome",
+        "Healthy Exploration Phase",
+        "Iterative Refinement",
+        "Strategic Pivot",
+        "Scattered Approach",
+        "Depth Building",
+        "Multi-Pillar Integration"
+    ]
+
+    def __init__(self, rag_utils: Optional[GeminiRAGUtils] = None):
+        self.rag_utils = rag_utils or get_rag_utils()
     
-    async def classify_patterns(self, drift_report: Dict[str, Any], trajectory: str, quarterly_goal: str)  -> str:
+    async def classify_patterns(self, drift_report: Dict[str, Any], trajectory: str, quarterly_goal: str,
+                                use_cache: bool = True) -> str:
         """Classify behavioral patterns in OKR changes"""
         
         # Get context for pattern recognition
-        context = self.rag_utils.query_pillar_knowledge(
+        context = await self.rag_utils.aquery_pillar_knowledge(
             "CLT", f"learning behavior patterns for {quarterly_goal}", k=3
          )
         
@@ -60,5 +72,13 @@ class PatternClassifierAgent:
         Format as a detailed pattern analysis (3-4 sentences).
         """
         
-        pattern_analysis = await self.rag_utils.generate_with_context(prompt, context)
-        return pattern_analysis
\ No newline at end of file
+        pattern_analysis = await self.rag_utils.generate_with_context(prompt, context, use_cache=use_cache)
+        return pattern_analysis
+
+    @classmethod
+    def primary_pattern(cls, pattern_analysis: str) -> str:
+        """The reference pattern mentioned first in a classification, else Unclassified"""
+        text = (pattern_analysis or "").lower()
+        positions = [(text.find(pattern.lower()), pattern) for pattern in cls.PATTERNS]
+        found = [(position, pattern) for position, pattern in positions if position != -1]
+        return min(found)[1] if found else "Unclassified"
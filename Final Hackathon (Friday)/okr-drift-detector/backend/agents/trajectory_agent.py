@@ -1,40 +1,29 @@
-from utils.rag_utils import GeminiRAGUtils
-import json
+from utils.rag_utils import GeminiRAGUtils, get_rag_utils
+from utils.prompt_builder import PromptBuilder
 from typing import Dict, Any, List, Optional
-from datetime import datetime
 
 class TrajectoryMapperAgent:
-    def __init__(self):
-        self.rag_utils = GeminiRAGUtils()
+    def __init__(self, rag_utils: Optional[GeminiRAGUtils] = None):
+        self.rag_utils = rag_utils or get_rag_utils()
+        self.prompt_builder = PromptBuilder()
     
-    async def map_trajectory(self, okr_data: Dict[str, Any], quarterly_goal: str) -> str:
+    async def map_trajectory(self, okr_data: Dict[str, Any], quarterly_goal: str, use_cache: bool = True) -> str:
         """Map student's goal trajectory relative to quarterly goal across cycles"""
         
-        # Get context from all pillars for comprehensive analysis
+        # Get context from all pillars for comprehensive analysis (one batch per pillar)
+        context_queries = [
+            (okr.get("pillar", "CLT"), okr.get("title", ""), 2)
+            for okr in okr_data.get("okrs", [])
+        ]
         all_contexts = []
-        for okr in okr_data.get("okrs", []):
-            pillar = okr.get("pillar", "CLT")
-            objective = okr.get("title", "")
-            
-            context = self.rag_utils.query_pillar_knowledge(pillar, objective, k=2)
+        for context in await self.rag_utils.aquery_many(context_queries):
             all_contexts.extend(context)
         
-        # Create a serializable copy of the data
-        serializable_data = []
-        for okr in okr_data.get("okrs", []):
-            okr_copy = okr.copy()
-            if "submittedOn" in okr_copy and okr_copy["submittedOn"] is not None:
-                if isinstance(okr_copy["submittedOn"], datetime):
-                    okr_copy["submittedOn"] = okr_copy["submittedOn"].isoformat()
-                elif isinstance(okr_copy["submittedOn"], dict) and "$date" in okr_copy["submittedOn"]:
-                    # Handle MongoDB date format
-                    okr_copy["submittedOn"] = okr_copy["submittedOn"]["$date"]
-            serializable_data.append(okr_copy)
-        
         prompt = f"""
         Analyze the student's OKR progression  in relation to their quarterly goal: {quarterly_goal} across cycles and identify their trajectory.
         
-        OKR History: {json.dumps(serializable_data, indent=2)}
+        OKR History (newest first):
+        {self.prompt_builder.format_history(okr_data.get("okrs", []))}
         
         Consider the 5 OKR Pillars:
         - CLT: Center For Learning and Teaching (PrepInsta courses, GenAI, Product Management)
@@ -58,5 +47,7 @@ class TrajectoryMapperAgent:
         Provide a trajectory summary specifically about progress toward {quarterly_goal}
         """
         
-        trajectory_summary = await self.rag_utils.generate_with_context(prompt, all_contexts)
+        trajectory_summary = await self.rag_utils.generate_with_context(
+            prompt, self.prompt_builder.select_contexts(all_contexts), use_cache=use_cache
+        )
         return trajectory_summary
\ No newline at end of file
@@ -0,0 +1,270 @@
+# load_test.py
+"""Load generator for /analyze and /reports.
+
+Runs the app in-process with the local stand-ins for Gemini, Tavily and Chroma
+(FAKE_BACKENDS=all unless set otherwise), or against a running server with --url.
+Only MongoDB is needed. With --seed N, N synthetic students with OKR submissions
+are written first (ids from SEED_ID_BASE) and removed afterwards. Latencies of
+the stand-ins come from FAKE_GEMINI_LATENCY etc. (see utils/fake_backends.py);
+TAVILY_RATE_LIMIT still applies to the fake search client. In-process runs turn
+the Tavily, LLM and embedding caches off (unless --with-caches) so results are
+comparable between runs; the cache state is reported with the results.
+
+    python load_test.py --seed 50 --concurrency 16 --requests 400
+    FAKE_GEMINI_LATENCY=fixed:0 python load_test.py --seed 20 --force-refresh
+    python load_test.py --url http://localhost:8000 --students 1001,1002 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from termcolor import colored
+
+# Synthetic students, pillars, definitions and submissions all use ids from here up
+SEED_ID_BASE = 9_000_000
+SEED_DEPARTMENT = "LOADTEST"
+
+SEED_OKRS = {
+    "CLT": [("Value Added Course", "Complete a GenAI course with certification")],
+    "CFC": [("Hackathon", "Participate in a hackathon project"),
+            ("BMC Video Analysis", "Business model video for a startup")],
+    "SCD": [("LeetCode Problems", "Solve LeetCode programming problems")],
+    "IIPC": [("LinkedIn Connect", "Connect with industry professionals on LinkedIn"),
+             ("LinkedIn Article", "Write a professional LinkedIn article")],
+    "SRI": [("DT Engagement Activity", "Design thinking community impact activity")]
+}
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+async def seed_students(count: int, months: int, rng: random.Random) -> List[int]:
+    from models.okr_model import okr_definitions, okr_submissions, pillars, student_collection
+
+    await cleanup_seed()
+    now = datetime.utcnow()
+    pillar_ids = {pillar: SEED_ID_BASE + i for i, pillar in enumerate(SEED_OKRS)}
+    await pillars.insert_many([
+        {"_id": pillar_id, "pillarName": pillar, "isActive": True, "isDeleted": False,
+         "createdAt": now, "updatedAt": now}
+        for pillar, pillar_id in pillar_ids.items()
+    ])
+
+    definitions = []
+    for pillar, okrs in SEED_OKRS.items():
+        for okr_type, title in okrs:
+            definitions.append({
+                "_id": SEED_ID_BASE + len(definitions), "pillarId": pillar_ids[pillar],
+                "title": title, "description": f"{title} and share the outcome with your mentor",
+                "okrType": okr_type, "isGroup": False, "instructions": [],
+                "isActive": True, "isDeleted": False,
+                "startDate": now, "dueDate": now, "createdAt": now, "updatedAt": now
+            })
+    await okr_definitions.insert_many(definitions)
+
+    student_ids = [SEED_ID_BASE + i for i in range(count)]
+    await student_collection.insert_many([
+        {"_id": student_id, "name": f"Load Test {student_id - SEED_ID_BASE}",
+         "registerNumber": student_id, "department": SEED_DEPARTMENT, "branchId": SEED_ID_BASE,
+         "isActive": True, "isDeleted": False}
+        for student_id in student_ids
+    ])
+
+    month_ids = [(now.replace(day=1) - timedelta(days=31 * i)).strftime("%Y-%m") for i in range(months)]
+    submissions = []
+    for student_id in student_ids:
+        for month_id in month_ids:
+            for definition in rng.sample(definitions, k=min(3, len(definitions))):
+                submissions.append({
+                    "_id": SEED_ID_BASE + len(submissions), "studentId": student_id,
+                    "okrId": definition["_id"], "pillarId": definition["pillarId"],
+                    "monthId": month_id, "activity": [], "status": rng.choice(["Approved", "Pending"]),
+                    "submittedOn": now, "registerNumber": student_id, "branchId": SEED_ID_BASE,
+                    "isActive": True, "isDeleted": False
+                })
+    await okr_submissions.insert_many(submissions)
+
+    print(colored(f"🌱 Seeded {count} students with {len(submissions)} submissions", "blue"))
+    return student_ids
+
+async def cleanup_seed():
+    from models.okr_model import (cohort_rollups, drift_reports, node_checkpoints, okr_definitions,
+                                  okr_submissions, pillars, student_collection)
+
+    seeded = {"$gte": SEED_ID_BASE, "$lt": SEED_ID_BASE * 2}
+    for collection in (pillars, okr_definitions, okr_submissions, student_collection):
+        await collection.delete_many({"_id": seeded})
+    await drift_reports.delete_many({"student_id": seeded})
+    await node_checkpoints.delete_many({"student_id": seeded})
+    await cohort_rollups.delete_many({"value": {"$in": [SEED_DEPARTMENT, SEED_ID_BASE]}})
+
+async def run_load(client: httpx.AsyncClient, student_ids: List[int], args) -> Dict[str, Any]:
+    rng = random.Random(args.random_seed)
+    samples: Dict[str, List[float]] = {"/analyze": [], "/reports": []}
+    errors: Dict[str, int] = {"/analyze": 0, "/reports": 0}
+    deadline = time.perf_counter() + args.duration if args.duration else None
+    issued = 0
+
+    def next_request() -> Optional[Tuple[str, int]]:
+        # Drawn in issue order, so the request sequence depends only on --random-seed
+        nonlocal issued
+        if deadline is not None:
+            if time.perf_counter() >= deadline:
+                return None
+        elif issued >= args.requests:
+            return None
+        issued += 1
+        endpoint = "/reports" if rng.random() < args.reports_ratio else "/analyze"
+        return endpoint, rng.choice(student_ids)
+
+    async def worker():
+        while True:
+            request = next_request()
+            if request is None:
+                return
+            endpoint, student_id = request
+
+            started = time.perf_counter()
+            try:
+                if endpoint == "/analyze":
+                    response = await client.post("/analyze", json={
+                        "student_id": student_id,
+                        "quarterly_goal": args.goal,
+                        "current_level": args.level,
+                        "force_refresh": args.force_refresh
+                    })
+                else:
+                    response = await client.get(f"/reports/{student_id}")
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                samples[endpoint].append(time.perf_counter() - started)
+            else:
+                errors[endpoint] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    results = {"concurrency": args.concurrency, "elapsed_seconds": round(elapsed, 3), "endpoints": {}}
+    for endpoint, latencies in samples.items():
+        latencies.sort()
+        results["endpoints"][endpoint] = {
+            "requests": len(latencies) + errors[endpoint],
+            "errors": errors[endpoint],
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0
+        }
+    completed = sum(len(latencies) for latencies in samples.values())
+    results["throughput_rps"] = round(completed / elapsed, 2) if elapsed else 0
+    return results
+
+def print_results(results: Dict[str, Any]):
+    print(colored(f"\n📈 {results['throughput_rps']} req/s overall over {results['elapsed_seconds']}s "
+                  f"at concurrency {results['concurrency']}", "green"))
+    print(f"{'endpoint':<10} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for endpoint, stats in results["endpoints"].items():
+        print(f"{endpoint:<10} {stats['requests']:>8} {stats['errors']:>6} {stats['throughput_rps']:>8} "
+              f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9}")
+    enabled = [name for name, stats in results.get("caches", {}).items() if stats.get("enabled") is not False]
+    if enabled:
+        print(colored(f"⚠️ Caches on during the run: {', '.join(enabled)} "
+                      "(latencies include cache hits, see cache stats in --json output)", "yellow"))
+    elif "caches" in results:
+        print(colored("Caches: tavily, llm and embeddings off", "blue"))
+
+async def main(args):
+    rng = random.Random(args.random_seed)
+    app = None
+    if not args.url:
+        # Must be set before main is imported: the backends are chosen at construction
+        os.environ.setdefault("FAKE_BACKENDS", "all")
+        if not args.with_caches:
+            for variable in ("TAVILY_CACHE_ENABLED", "LLM_CACHE_ENABLED", "EMBEDDING_CACHE_ENABLED"):
+                os.environ.setdefault(variable, "false")
+
+    student_ids: Optional[List[int]] = None
+    if args.students:
+        student_ids = [int(student_id) for student_id in args.students.split(",")]
+    elif args.seed:
+        student_ids = await seed_students(args.seed, args.months, rng)
+    if not student_ids:
+        raise SystemExit("Pass --students or --seed")
+
+    try:
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        else:
+            import main as app
+            await app.startup_event()
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=app.app), base_url="http://loadtest", timeout=args.timeout
+            )
+
+        async with client:
+            if args.warmup:
+                print(colored(f"🔥 Warming up with {args.warmup} requests...", "blue"))
+                warmup_args = argparse.Namespace(**{**vars(args), "requests": args.warmup, "duration": None})
+                await run_load(client, student_ids, warmup_args)
+
+            print(colored(f"🚀 Running load: concurrency {args.concurrency}, "
+                          f"{f'{args.duration}s' if args.duration else f'{args.requests} requests'}", "blue"))
+            results = await run_load(client, student_ids, args)
+            response = await client.get("/cache-stats")
+            if response.status_code == 200:
+                results["caches"] = response.json()
+
+        print_results(results)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        if app is not None:
+            await app.shutdown_event()
+        if args.seed and not args.students and not args.keep_seed:
+            await cleanup_seed()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--students", help="Comma-separated existing student ids")
+    parser.add_argument("--seed", type=int, default=0, help="Create this many synthetic students")
+    parser.add_argument("--months", type=int, default=3, help="Months of submissions per seeded student")
+    parser.add_argument("--keep-seed", action="store_true", help="Leave seeded data in MongoDB")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=0, help="Unmeasured requests sent first")
+    parser.add_argument("--reports-ratio", type=float, default=0.5, help="Share of requests to /reports")
+    parser.add_argument("--force-refresh", action="store_true", help="Rerun analyses instead of reusing stored reports")
+    parser.add_argument("--goal", default="career development")
+    parser.add_argument("--level", default="beginner")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--random-seed", type=int, default=0, help="Seed for the request mix and synthetic data")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--with-caches", action="store_true",
+                        help="Keep the Tavily, LLM and embedding caches on for in-process runs")
+    args = parser.parse_args()
+    if args.duration is not None and args.duration <= 0:
+        parser.error("--duration must be positive")
+    if args.duration is None and args.requests < 1:
+        parser.error("--requests must be at least 1 (or use --duration)")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if not 0 <= args.reports_ratio <= 1:
+        parser.error("--reports-ratio must be between 0 and 1")
+    asyncio.run(main(args))
@@ -1,21 +1,23 @@
 # main.py
-import json
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Dict, List, Any, Optional, TypedDict
+from typing import Dict, List, Any, Optional, TypedDict, Annotated
 from datetime import datetime
-from bson import json_util
+import os
 import sys
 import time
 import asyncio
+import operator
+import uuid
 from termcolor import colored
 from enum import Enum
 from utils.tavily_client import TavilySearch
 
 # LangGraph imports
 from langgraph.graph import StateGraph, END
-from langchain_core.runnables import RunnableLambda
+from langgraph.graph.graph import START
 
 # Agent imports
 from agents.extractor_agent import OKRExtractorAgent
@@ -23,8 +25,18 @@ from agents.trajectory_agent import TrajectoryMapperAgent
 from agents.drift_agent import DriftDetectorAgent
 from agents.pattern_agent import PatternClassifierAgent
 from agents.coach_agent import CoachingAgent
-from utils.rag_utils import GeminiRAGUtils
-from models.okr_model import db, drift_reports, student_collection, okr_submissions
+from utils.rag_utils import LLM_ERROR_PREFIX, get_rag_utils, shutdown_retrieval
+from utils.node_checkpoints import NodeCheckpointStore
+from utils.pillar_analytics import PillarAnalyticsEngine
+from utils.cohort_rollups import CohortRollupStore
+from utils.query_diagnostics import explain_find, explain_aggregate
+from utils.job_queue import AnalysisJobQueue, JobWorkerPool
+from utils import metrics
+from utils.json_response import BSONJSONResponse, dumps as encode_json
+from models.okr_model import (
+    db, drift_reports, student_collection, okr_submissions,
+    okr_definition_cache, pillar_cache, ensure_indexes, backfill_report_student_ids
+)
 
 app = FastAPI(title="OKR Goal-Drift Detection System")
 
@@ -38,6 +50,8 @@ app.add_middleware(
 
 class AgentState(TypedDict):
     student_id: int
+    source_fingerprint: str  # submissions + reference data + knowledge base version, see compute_source_fingerprint
+    force_refresh: bool
     student_name: str
     register_number: str
     quarterly_goal: str  # Add this line
@@ -47,8 +61,12 @@ class AgentState(TypedDict):
     drift_report: Dict[str, Any]
     pattern_classification: str
     coaching_recommendations: List[str]
+    coaching_prefetch_key: Optional[str]  # run key of the prefetch task owned by analyze_student
+    pillar_analysis: Dict[str, Any]
+    readiness_score: int
     analysis_timestamp: datetime
-    messages: List[Dict[str, Any]]
+    # Reducer channel: parallel branches may append in the same step
+    messages: Annotated[List[Dict[str, Any]], operator.add]
     progress: Optional[Any]
 
 class NodeType(str, Enum):
@@ -56,6 +74,7 @@ class NodeType(str, Enum):
     MAP_TRAJECTORY = "map_trajectory"
     DETECT_DRIFT = "detect_drift"
     CLASSIFY_PATTERNS = "classify_patterns"
+    ANALYZE_PILLARS = "analyze_pillars"
     GENERATE_COACHING = "generate_coaching"
 
 class TerminalProgress:
@@ -85,37 +104,102 @@ class TerminalProgress:
         ))
         sys.stdout.flush()
     
+    def node_started(self, node: str, message: str):
+        self.update(message)
+    
+    def node_finished(self, node: str, output: Dict[str, Any]):
+        pass
+    
     def complete(self):
         total_time = time.time() - self.start_time
         print(colored("\n✅ Analysis Complete!", "green", attrs=["bold"]))
         print(colored(f"⏱️  Total Time: {total_time:.2f} seconds", "green"))
         print(colored("="*60 + "\n", "cyan"))
 
+class StreamingProgress(TerminalProgress):
+    """Progress hook that also queues a structured event per workflow node for SSE clients"""
+    # Node outputs safe and useful to send to the client as partial results
+    STREAMED_KEYS = [
+        "student_name", "trajectory_summary", "drift_report", "pattern_classification",
+        "pillar_analysis", "readiness_score", "coaching_recommendations"
+    ]
+    
+    def __init__(self, total_steps=5):
+        super().__init__(total_steps)
+        self.events: asyncio.Queue = asyncio.Queue()
+        self._node_started_at: Dict[str, float] = {}
+    
+    def emit(self, event: str, **data):
+        self.events.put_nowait({
+            "event": event,
+            "elapsed": round(time.time() - self.start_time, 3),
+            **data
+        })
+    
+    def close(self):
+        self.events.put_nowait(None)
+    
+    def start(self, student_name: str):
+        super().start(student_name)
+        self.emit("analysis_start", student_name=student_name, total_steps=self.total_steps)
+    
+    def node_started(self, node: str, message: str):
+        super().node_started(node, message)
+        self._node_started_at[node] = time.time()
+        self.emit("node_start", node=node, step=self.current_step, message=message)
+    
+    def node_finished(self, node: str, output: Dict[str, Any]):
+        super().node_finished(node, output)
+        partial = {key: output[key] for key in self.STREAMED_KEYS if key in output}
+        if "okr_history" in output:
+            partial["okr_count"] = len(output["okr_history"])
+        self.emit(
+            "node_end",
+            node=node,
+            duration=round(time.time() - self._node_started_at.pop(node, time.time()), 3),
+            output=partial
+        )
+    
+    @staticmethod
+    def format_sse(event: Dict[str, Any]) -> str:
+        return f"event: {event['event']}\ndata: {encode_json(event).decode()}\n\n"
+
 class OKRAnalysisRequest(BaseModel):
     student_id: int
     quarterly_goal: str = Field(default="career development", description="Student's goal for the quarter")
     current_level: str = Field(default="beginner", description="Current skill level")
+    force_refresh: bool = Field(default=False, description="Rerun even if nothing changed since the last report")
+
+class CohortAnalysisRequest(BaseModel):
+    student_ids: Optional[List[int]] = Field(default=None, description="Explicit students to analyze")
+    department: Optional[str] = Field(default=None, description="Analyze every active student in this department")
+    branch_id: Optional[int] = Field(default=None, description="Analyze every active student in this branch")
+    quarterly_goal: str = Field(default="career development", description="Goal applied to every student")
+    current_level: str = Field(default="beginner", description="Current skill level")
+    concurrency: int = Field(
+        default=int(os.getenv("BATCH_ANALYSIS_CONCURRENCY", "4")), ge=1, le=32,
+        description="Maximum analyses in flight"
+    )
+    force_refresh: bool = Field(default=False, description="Rerun even if nothing changed since the last report")
 
     
 class OKRDriftDetectorSystem:
     def __init__(self):
-        self.extractor_agent = OKRExtractorAgent()
-        self.trajectory_agent = TrajectoryMapperAgent()
-        self.drift_agent = DriftDetectorAgent()
-        self.pattern_agent = PatternClassifierAgent()
-        self.coach_agent = CoachingAgent()
-        self.rag_utils = GeminiRAGUtils()
+        # One shared RAG context (Chroma client, embeddings, Gemini model) for all agents
+        self.rag_utils = get_rag_utils()
         self.tavily_client = TavilySearch()
 
-        # Define tools
-        self.tools = {
-            "extract_okrs": RunnableLambda(self._extract_okrs_tool),
-            "map_trajectory": RunnableLambda(self._map_trajectory_tool),
-            "detect_drift": RunnableLambda(self._detect_drift_tool),
-            "classify_patterns": RunnableLambda(self._classify_patterns_tool),
-            "generate_coaching": RunnableLambda(self._generate_coaching_tool)
-        }
-        
+        self.extractor_agent = OKRExtractorAgent(self.rag_utils)
+        self.trajectory_agent = TrajectoryMapperAgent(self.rag_utils)
+        self.drift_agent = DriftDetectorAgent(self.rag_utils)
+        self.pattern_agent = PatternClassifierAgent(self.rag_utils)
+        self.coach_agent = CoachingAgent(self.rag_utils, self.tavily_client)
+        self.node_checkpoints = NodeCheckpointStore()
+        self.pillar_analytics = PillarAnalyticsEngine()
+        self.cohort_rollups = CohortRollupStore()
+        # Coaching search prefetches of in-flight runs, by coaching_prefetch_key
+        self._coaching_prefetches: Dict[str, asyncio.Task] = {}
+
         self.workflow = self._create_workflow()
 
     async def _extract_okrs_tool(self, student_id: int) -> Dict[str, Any]:
@@ -127,208 +211,221 @@ class OKRDriftDetectorSystem:
             "register_number": okr_data["student_info"]["register_number"]
         }
 
-    async def _map_trajectory_tool(self, okr_history: List[Dict[str, Any]]) -> str:
-        """Tool to map learning trajectory"""
-        trajectory_summary = await self.trajectory_agent.map_trajectory({"okrs": okr_history})
-        return trajectory_summary
-
-    async def _detect_drift_tool(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Tool to detect goal drift"""
-        drift_report = await self.drift_agent.detect_drift(
-            state["trajectory_summary"],
-            {"okrs": state["okr_history"]}
-        )
-        return drift_report
-
-    async def _classify_patterns_tool(self, state: Dict[str, Any]) -> str:
-        """Tool to classify behavioral patterns"""
-        pattern_classification = await self.pattern_agent.classify_patterns(
-            state["drift_report"],
-            state["trajectory_summary"]
-        )
-        return pattern_classification
-
     async def _generate_coaching_tool(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Tool to generate coaching recommendations"""
+        prefetched = None
+        prefetch = self._coaching_prefetches.get(state.get("coaching_prefetch_key"))
+        if prefetch is not None:
+            # wait() never raises the prefetch's own error or cancellation
+            await asyncio.wait([prefetch])
+            if not prefetch.cancelled() and prefetch.exception() is None:
+                prefetched = prefetch.result()
+            else:
+                print(colored("⚠️ Coaching prefetch did not complete, searching inline", "yellow"))
+        
         coaching_recommendations = await self.coach_agent.generate_coaching(
             state["pattern_classification"],
             state["drift_report"],
             state["trajectory_summary"],
             state["quarterly_goal"],
-            state["current_level"]
+            state["current_level"],
+            prefetched=prefetched,
+            use_cache=not state.get("force_refresh")
         )
         return coaching_recommendations
 
     def _create_workflow(self) -> StateGraph:
         """Create the LangGraph workflow"""
         
-        def should_continue(state: AgentState) -> str:
-            if "okr_history" not in state or not state["okr_history"]:
-                return NodeType.EXTRACT_OKRS
-            elif "trajectory_summary" not in state:
-                return NodeType.MAP_TRAJECTORY
-            elif "drift_report" not in state:
-                return NodeType.DETECT_DRIFT
-            elif "pattern_classification" not in state:
-                return NodeType.CLASSIFY_PATTERNS
-            elif "coaching_recommendations" not in state:
-                return NodeType.GENERATE_COACHING
-            else:
-                return END
+        def tracked(node: NodeType, message: str, node_fn):
+            """Report node start/end (with its partial output) to the progress hook"""
+            async def run(state: AgentState) -> Dict[str, Any]:
+                progress = state.get("progress")
+                if progress:
+                    progress.node_started(node, message)
+                started = time.perf_counter()
+                try:
+                    output = await node_fn(state)
+                except Exception:
+                    metrics.NODE_FAILURES.labels(node.value).inc()
+                    raise
+                finally:
+                    metrics.NODE_DURATION.labels(node.value).observe(time.perf_counter() - started)
+                if progress:
+                    progress.node_finished(node, output)
+                return output
+            return run
 
+        def checkpointed(node: NodeType, input_keys: List[str], node_fn, is_valid=None):
+            """Replay the node's stored output when its inputs are unchanged"""
+            async def run(state: AgentState) -> Dict[str, Any]:
+                store = self.node_checkpoints
+                if not store.enabled:
+                    return await node_fn(state)
+                
+                key = store.make_key(node, state, input_keys)
+                if not state.get("force_refresh"):
+                    output = await store.load(key)
+                    if output is not None:
+                        return output
+                
+                output = await node_fn(state)
+                # Never persist LLM failures, so the next run retries them
+                if LLM_ERROR_PREFIX.encode() not in encode_json(output) and (
+                        is_valid is None or is_valid(output)):
+                    await store.save(key, node, output, student_id=state.get("student_id"))
+                return output
+            return run
+
+        # Nodes return only the keys they produce, so parallel branches never
+        # write the same state key in one step
         async def extract_okrs_node(state: AgentState) -> Dict[str, Any]:
-            if state.get("progress"):
-                state["progress"].update("Extracting student OKR history from database")
-            
             result = await self._extract_okrs_tool(state["student_id"])
             return {
-                **state,
                 "okr_history": result["okr_history"],
                 "student_name": result["student_name"],
                 "register_number": result["register_number"]
             }
 
+        async def analyze_pillars_node(state: AgentState) -> Dict[str, Any]:
+            return self.pillar_analytics.analyze(state["okr_history"])
+
         async def map_trajectory_node(state: AgentState) -> Dict[str, Any]:
-            if state.get("progress"):
-                state["progress"].update("Mapping learning trajectory across OKR cycles")
-            
             trajectory_summary = await self.trajectory_agent.map_trajectory(
                 {"okrs": state["okr_history"]},
-                state["quarterly_goal"]  # Pass the goal
+                state["quarterly_goal"],  # Pass the goal
+                use_cache=not state.get("force_refresh")
             )
-            return {
-                **state,
-                "trajectory_summary": trajectory_summary
-            }
+            return {"trajectory_summary": trajectory_summary}
 
         async def detect_drift_node(state: AgentState) -> Dict[str, Any]:
-            if state.get("progress"):
-                state["progress"].update("Analyzing goal drift patterns")
-            
             drift_report = await self.drift_agent.detect_drift(
                 state["trajectory_summary"],
                 {"okrs": state["okr_history"]},
-                state["quarterly_goal"]  # Pass the goal
+                state["quarterly_goal"],  # Pass the goal
+                use_cache=not state.get("force_refresh")
             )
-            return {
-                **state,
-                "drift_report": drift_report
-            }
+            return {"drift_report": drift_report}
 
         async def classify_patterns_node(state: AgentState) -> Dict[str, Any]:
-            if state.get("progress"):
-                state["progress"].update("Classifying behavioral patterns")
-            
             pattern_classification = await self.pattern_agent.classify_patterns(
                 state["drift_report"],
                 state["trajectory_summary"],
-                state["quarterly_goal"]  # Pass the goal
+                state["quarterly_goal"],  # Pass the goal
+                use_cache=not state.get("force_refresh")
             )
-            return {
-                **state,
-                "pattern_classification": pattern_classification
-            }
+            return {"pattern_classification": pattern_classification}
 
         async def generate_coaching_node(state: AgentState) -> Dict[str, Any]:
-            if state.get("progress"):
-                state["progress"].update("Generating coaching recommendations")
-            
             coaching_recommendations = await self._generate_coaching_tool(state)
             return {
-                **state,
                 "coaching_recommendations": coaching_recommendations,
                 "analysis_timestamp": datetime.now()
             }
 
         workflow = StateGraph(AgentState)
         
-        workflow.add_node(NodeType.EXTRACT_OKRS, extract_okrs_node)
-        workflow.add_node(NodeType.MAP_TRAJECTORY, map_trajectory_node)
-        workflow.add_node(NodeType.DETECT_DRIFT, detect_drift_node)
-        workflow.add_node(NodeType.CLASSIFY_PATTERNS, classify_patterns_node)
-        workflow.add_node(NodeType.GENERATE_COACHING, generate_coaching_node)
+        # source_fingerprint covers the OKR definitions, pillars and kb_version as well as
+        # the submissions, so edited reference data or a resynced knowledge base re-extracts
+        workflow.add_node(NodeType.EXTRACT_OKRS, tracked(
+            NodeType.EXTRACT_OKRS, "Extracting student OKR history from database",
+            checkpointed(NodeType.EXTRACT_OKRS, ["student_id", "source_fingerprint"], extract_okrs_node)
+        ))
+        workflow.add_node(NodeType.ANALYZE_PILLARS, tracked(
+            NodeType.ANALYZE_PILLARS, "Scoring pillar coverage and goal readiness", analyze_pillars_node
+        ))
+        workflow.add_node(NodeType.MAP_TRAJECTORY, tracked(
+            NodeType.MAP_TRAJECTORY, "Mapping learning trajectory across OKR cycles",
+            checkpointed(NodeType.MAP_TRAJECTORY, ["okr_history", "quarterly_goal"], map_trajectory_node)
+        ))
+        workflow.add_node(NodeType.DETECT_DRIFT, tracked(
+            NodeType.DETECT_DRIFT, "Analyzing goal drift patterns",
+            checkpointed(
+                NodeType.DETECT_DRIFT, ["trajectory_summary", "okr_history", "quarterly_goal"], detect_drift_node,
+                is_valid=lambda output: output["drift_report"].get("reasoning") != DriftDetectorAgent.PARSE_FAILED_REASONING
+            )
+        ))
+        workflow.add_node(NodeType.CLASSIFY_PATTERNS, tracked(
+            NodeType.CLASSIFY_PATTERNS, "Classifying behavioral patterns",
+            checkpointed(NodeType.CLASSIFY_PATTERNS, ["drift_report", "trajectory_summary", "quarterly_goal"], classify_patterns_node)
+        ))
+        workflow.add_node(NodeType.GENERATE_COACHING, tracked(
+            NodeType.GENERATE_COACHING, "Generating coaching recommendations", generate_coaching_node
+        ))
+        
+        # Coaching searches are prefetched outside the graph, see analyze_student
+        workflow.add_edge(START, NodeType.EXTRACT_OKRS)
         
+        # Pillar scoring runs alongside the LLM chain once the history is extracted
         workflow.add_edge(NodeType.EXTRACT_OKRS, NodeType.MAP_TRAJECTORY)
+        workflow.add_edge(NodeType.EXTRACT_OKRS, NodeType.ANALYZE_PILLARS)
         workflow.add_edge(NodeType.MAP_TRAJECTORY, NodeType.DETECT_DRIFT)
         workflow.add_edge(NodeType.DETECT_DRIFT, NodeType.CLASSIFY_PATTERNS)
-        workflow.add_edge(NodeType.CLASSIFY_PATTERNS, NodeType.GENERATE_COACHING)
-        workflow.add_edge(NodeType.GENERATE_COACHING, END)
         
-        workflow.set_entry_point(NodeType.EXTRACT_OKRS)
+        # Join: coaching assembly waits for every branch
+        workflow.add_edge(
+            [NodeType.CLASSIFY_PATTERNS, NodeType.ANALYZE_PILLARS],
+            NodeType.GENERATE_COACHING
+        )
+        workflow.add_edge(NodeType.GENERATE_COACHING, END)
         
         return workflow.compile()
 
-    def _generate_pillar_analysis(self, okr_history: List[Dict]) -> Dict[str, Any]:
-        """Generate pillar analysis scores based on OKR history"""
-        pillar_scores = {
-            "CLT": {"score": 0, "focus": "", "completion": 0, "trend": "stable"},
-            "CFC": {"score": 0, "focus": "", "completion": 0, "trend": "stable"},
-            "SCD": {"score": 0, "focus": "", "completion": 0, "trend": "stable"},
-            "IIPC": {"score": 0, "focus": "", "completion": 0, "trend": "stable"},
-            "SRI": {"score": 0, "focus": "", "completion": 0, "trend": "stable"}
-        }
-        
-        # Count OKRs per pillar and track focus areas
-        pillar_counts = {p: 0 for p in pillar_scores.keys()}
-        pillar_focus = {p: {} for p in pillar_scores.keys()}  # Track frequency of focus areas
-        
-        for okr in okr_history:
-            pillar = okr.get("pillar")
-            if pillar in pillar_counts:
-                pillar_counts[pillar] += 1
-                
-                # Extract focus from title or description
-                focus_text = okr.get("title", "").lower() + " " + okr.get("description", "").lower()
-                
-                # Common focus areas for each pillar
-                focus_keywords = {
-                    "CLT": ["genai", "course", "learning", "product management", "innovation"],
-                    "CFC": ["hackathon", "project", "startup", "business model", "commercial"],
-                    "SCD": ["leetcode", "competitive", "exam", "skill", "programming"],
-                    "IIPC": ["linkedin", "network", "article", "professional", "connect"],
-                    "SRI": ["community", "design thinking", "social", "responsibility", "impact"]
-                }
-                
-                # Find most relevant focus keyword
-                for keyword in focus_keywords.get(pillar, []):
-                    if keyword in focus_text:
-                        pillar_focus[pillar][keyword] = pillar_focus[pillar].get(keyword, 0) + 1
-        
-        # Calculate scores and determine focus
-        total_okrs = len(okr_history)
-        for pillar, count in pillar_counts.items():
-            if total_okrs > 0:
-                score = min(100, int((count / total_okrs) * 100 * 2))  # Scale to make scores meaningful
-                pillar_scores[pillar]["score"] = score
-                pillar_scores[pillar]["completion"] = score
-                
-                # Determine focus area
-                if pillar_focus[pillar]:
-                    most_common_focus = max(pillar_focus[pillar].items(), key=lambda x: x[1])[0]
-                    pillar_scores[pillar]["focus"] = most_common_focus.title()
-                else:
-                    pillar_scores[pillar]["focus"] = "General"  # Default if no specific focus
-                
-                # Simple trend calculation
-                if score > 60:
-                    pillar_scores[pillar]["trend"] = "up"
-                elif score < 40:
-                    pillar_scores[pillar]["trend"] = "down"
-        
-        return pillar_scores
+    @staticmethod
+    def _is_complete(workflow_result: Dict[str, Any]) -> bool:
+        """True when no stage fell back to a degraded output (LLM error text, the drift
+        parsing fallback, or a coaching plan without a single search result)"""
+        outputs = [
+            workflow_result["trajectory_summary"], workflow_result["drift_report"],
+            workflow_result["pattern_classification"], workflow_result["coaching_recommendations"]
+        ]
+        if LLM_ERROR_PREFIX.encode() in encode_json(outputs):
+            return False
+        if workflow_result["drift_report"].get("reasoning") == DriftDetectorAgent.PARSE_FAILED_REASONING:
+            return False
+        roadmap = (workflow_result["coaching_recommendations"] or {}).get("quarterly_roadmap", {})
+        return any(
+            "recommendations" in plan
+            for month in roadmap.values()
+            for pillar_plan in month.values()
+            for plan in pillar_plan.values()
+        )
+
+    async def analyze_student(self, student_id: int, quarterly_goal: str, current_level: str,
+                              progress: Optional[TerminalProgress] = None,
+                              force_refresh: bool = False) -> Dict[str, Any]:
+        """Run the complete analysis for a student.
 
-    async def analyze_student(self, student_id: int, quarterly_goal: str, current_level: str) -> Dict[str, Any]:
-        """Run the complete analysis for a student"""
-        progress = TerminalProgress(total_steps=5)
+        If nothing the analysis depends on has changed since the last complete stored
+        report (same fingerprint), that report is returned unless ``force_refresh`` is set.
+        """
+        progress = progress or TerminalProgress(total_steps=len(NodeType))
     
         student = await student_collection.find_one({"_id": student_id})
         if not student:
             raise HTTPException(status_code=404, detail="Student not found")
         
+        source_fingerprint = await self.extractor_agent.compute_source_fingerprint(student_id)
+        fingerprint = self.extractor_agent.analysis_fingerprint(
+            source_fingerprint, quarterly_goal, current_level
+        )
+        if not force_refresh:
+            previous = await drift_reports.find_one(
+                {"student_id": student_id, "fingerprint": fingerprint, "complete": True},
+                sort=[("analysis_date", -1)]
+            )
+            if previous:
+                print(colored(f"\n♻️  No changes for {student['name']} since "
+                              f"{previous['analysis_date']}, returning stored report", "green"))
+                return previous
+        
         progress.start(student["name"])
+        prefetch_key = uuid.uuid4().hex
         
         initial_state = AgentState(
             student_id=student_id,
+            source_fingerprint=source_fingerprint,
+            force_refresh=force_refresh,
             student_name=student["name"],
             register_number=student["registerNumber"],
             quarterly_goal=quarterly_goal,  # Explicitly set here
@@ -338,14 +435,30 @@ class OKRDriftDetectorSystem:
             drift_report={},
             pattern_classification="",
             coaching_recommendations=[],
+            coaching_prefetch_key=prefetch_key,
+            pillar_analysis={},
+            readiness_score=0,
             analysis_timestamp=datetime.now(),
             messages=[],
             progress=progress
         )
         
-        workflow_result = await self.workflow.ainvoke(initial_state)
+        # The coaching searches only need the goal and level, so they run alongside the
+        # whole workflow. The task is owned here rather than kept in graph state, and is
+        # cancelled if the workflow fails or is cancelled before coaching awaits it.
+        prefetch = asyncio.ensure_future(
+            self.coach_agent.prefetch_recommendations(quarterly_goal, current_level, use_cache=not force_refresh)
+        )
+        prefetch.add_done_callback(lambda task: task.cancelled() or task.exception())
+        self._coaching_prefetches[prefetch_key] = prefetch
+        try:
+            workflow_result = await self.workflow.ainvoke(initial_state)
+        finally:
+            del self._coaching_prefetches[prefetch_key]
+            prefetch.cancel()
         
         report = {
+            "student_id": workflow_result["student_id"],
             "student_info": {
                 "id": workflow_result["student_id"],
                 "name": workflow_result["student_name"],
@@ -354,46 +467,189 @@ class OKRDriftDetectorSystem:
             "goal_analysis": {
                 "quarterly_goal": quarterly_goal,
                 "current_level": current_level,
-                "readiness_score": self._calculate_readiness_score(workflow_result["okr_history"])
+                "readiness_score": workflow_result["readiness_score"]
             },
             "drift_analysis": workflow_result["drift_report"],
             "pattern_analysis": workflow_result["pattern_classification"],
             "coaching_plan": workflow_result["coaching_recommendations"],
-            "pillar_analysis": self._generate_pillar_analysis(workflow_result["okr_history"]),
-            "analysis_date": workflow_result["analysis_timestamp"]
+            "pillar_analysis": workflow_result["pillar_analysis"],
+            "analysis_date": workflow_result["analysis_timestamp"],
+            "fingerprint": fingerprint,
+            # Only complete reports are reused for unchanged inputs; degraded ones are rerun
+            "complete": self._is_complete(workflow_result)
         }
         
         await drift_reports.insert_one(report)
+        await self.cohort_rollups.record(report, student)
         progress.complete()
         
         return report
 
-    def _calculate_readiness_score(self, okr_history: List[Dict]) -> int:
-        """Calculate how prepared the student is for their goal"""
-        relevant_okrs = [okr for okr in okr_history 
-                        if okr.get("pillar") in ["CLT", "CFC", "SCD"]]
-        return min(100, len(relevant_okrs) * 10)  # Simple metric - improve as needed
-
 system = OKRDriftDetectorSystem()
 
+async def run_analysis_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    request = OKRAnalysisRequest(**payload)
+    return await system.analyze_student(
+        request.student_id,
+        request.quarterly_goal,
+        request.current_level,
+        force_refresh=request.force_refresh
+    )
+
+job_queue = AnalysisJobQueue()
+job_workers = JobWorkerPool(job_queue, run_analysis_job)
+
 @app.post("/analyze")
-async def analyze_okrs(request: OKRAnalysisRequest):
+async def analyze_okrs(request: OKRAnalysisRequest, job: bool = False):
+    """Run an analysis and return the report, or with ``?job=true`` queue it and return a job id"""
     try:
         print(colored(f"\n🔎 Received analysis request for student ID: {request.student_id}", "blue"))
         print(colored(f"🎯 Quarterly Goal: {request.quarterly_goal}", "cyan"))
         print(colored(f"📊 Current Level: {request.current_level}", "cyan"))
         
+        if job:
+            job_id = await job_queue.enqueue(request.model_dump())
+            job_workers.notify()
+            print(colored(f"📥 Queued analysis job {job_id}", "blue"))
+            return JSONResponse(
+                status_code=202,
+                content={"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+            )
+        
         result = await system.analyze_student(
             request.student_id, 
             request.quarterly_goal,
-            request.current_level
+            request.current_level,
+            force_refresh=request.force_refresh
         )
         
-        return json.loads(json_util.dumps(result))
+        return BSONJSONResponse(result)
     except Exception as e:
         print(colored(f"\n❌ Analysis error: {str(e)}", "red"))
         raise HTTPException(status_code=500, detail=str(e))
         
+@app.post("/analyze/stream")
+async def analyze_okrs_stream(request: OKRAnalysisRequest):
+    """Server-sent events variant of /analyze: one event per workflow node, then the report"""
+    print(colored(f"\n📡 Received streaming analysis request for student ID: {request.student_id}", "blue"))
+    progress = StreamingProgress(total_steps=len(NodeType))
+    
+    async def run_analysis():
+        try:
+            report = await system.analyze_student(
+                request.student_id,
+                request.quarterly_goal,
+                request.current_level,
+                progress=progress,
+                force_refresh=request.force_refresh
+            )
+            progress.emit("complete", report=report)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            print(colored(f"\n❌ Analysis error: {detail}", "red"))
+            progress.emit("error", detail=detail)
+        finally:
+            progress.close()
+    
+    async def event_stream():
+        task = asyncio.create_task(run_analysis())
+        try:
+            while (event := await progress.events.get()) is not None:
+                yield StreamingProgress.format_sse(event)
+        finally:
+            # No-op once finished; stops the analysis if the client disconnects
+            task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/analyze/batch")
+async def analyze_cohort(request: CohortAnalysisRequest):
+    """Analyze many students concurrently, streaming one NDJSON line per finished report"""
+    if request.student_ids:
+        student_ids = list(dict.fromkeys(request.student_ids))
+    elif request.department or request.branch_id is not None:
+        query = {"isActive": True, "isDeleted": False}
+        if request.department:
+            query["department"] = request.department
+        if request.branch_id is not None:
+            query["branchId"] = request.branch_id
+        student_ids = await student_collection.distinct("_id", query)
+    else:
+        raise HTTPException(status_code=400, detail="Provide student_ids, department or branch_id")
+    
+    print(colored(f"\n👥 Cohort analysis for {len(student_ids)} students "
+                  f"(concurrency {request.concurrency})", "blue"))
+    semaphore = asyncio.Semaphore(request.concurrency)
+    
+    async def analyze_one(student_id: int) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                report = await system.analyze_student(
+                    student_id, request.quarterly_goal, request.current_level,
+                    force_refresh=request.force_refresh
+                )
+                return {"student_id": student_id, "status": "completed", "report": report}
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                print(colored(f"\n❌ Analysis error for student {student_id}: {detail}", "red"))
+                return {"student_id": student_id, "status": "failed", "error": detail}
+    
+    async def stream_reports():
+        tasks = [asyncio.create_task(analyze_one(student_id)) for student_id in student_ids]
+        try:
+            # Emit in completion order so the client never waits on the slowest student
+            for finished in asyncio.as_completed(tasks):
+                yield encode_json(await finished) + b"\n"
+        finally:
+            # Client went away: stop the analyses still queued or running
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(stream_reports(), media_type="application/x-ndjson")
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    status = {
+        "job_id": job["_id"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at")
+    }
+    if job["status"] == "completed":
+        status["result"] = job["result"]
+    elif job["status"] == "failed":
+        status["error"] = job.get("error")
+    return BSONJSONResponse(status)
+
+@app.get("/cohorts/{cohort_id}/summary")
+async def cohort_summary(cohort_id: str, month: str = "all"):
+    """Drift levels, patterns, average pillar scores and readiness for a cohort.
+
+    ``cohort_id`` is ``department:<name>`` or ``branch:<id>``; ``month`` is ``YYYY-MM`` or ``all``.
+    """
+    kind, _, value = cohort_id.partition(":")
+    if kind not in ("department", "branch") or not value:
+        raise HTTPException(status_code=400, detail="Cohort id must be department:<name> or branch:<id>")
+    if kind == "branch":
+        if not value.isdigit():
+            raise HTTPException(status_code=400, detail="Branch id must be numeric")
+        value = int(value)
+    
+    summary = await system.cohort_rollups.summary(kind, value, month)
+    if not summary:
+        raise HTTPException(status_code=404, detail="No reports for this cohort")
+    return BSONJSONResponse(summary)
+
 @app.get("/reports/{student_id}")
 async def get_reports(student_id: int):
     print(colored(f"\n📂 Fetching reports for student ID: {student_id}", "blue"))
@@ -402,7 +658,7 @@ async def get_reports(student_id: int):
     ).sort("analysis_date", -1).limit(5)
     
     reports = await cursor.to_list(length=None)
-    return json.loads(json_util.dumps(reports))
+    return BSONJSONResponse(reports)
 
 @app.on_event("startup")
 async def startup_event():
@@ -412,8 +668,10 @@ async def startup_event():
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            print(colored(f"📚 Loading RAG knowledge base (attempt {attempt+1})...", "blue"))
-            await system.rag_utils.fetch_and_store_pillar_data()
+            print(colored(f"📚 Syncing RAG knowledge base (attempt {attempt+1})...", "blue"))
+            counts = await system.rag_utils.sync_pillar_data()
+            print(colored(f"  - {counts['added']} added, {counts['updated']} updated, "
+                          f"{counts['deleted']} deleted, {counts['unchanged']} unchanged", "blue"))
             break
         except Exception as e:
             print(colored(f"⚠️ Startup error: {str(e)}", "yellow"))
@@ -422,8 +680,41 @@ async def startup_event():
                 raise
             await asyncio.sleep(2)
     
+    print(colored("🗂️ Preloading OKR definition and pillar caches...", "blue"))
+    for cache in (okr_definition_cache, pillar_cache):
+        await cache.preload()
+        if os.getenv("REFERENCE_CACHE_WATCH", "false").lower() == "true":
+            cache.start_watching()
+    
+    print(colored("📇 Ensuring MongoDB indexes...", "blue"))
+    await ensure_indexes()
+    await system.node_checkpoints.ensure_indexes()
+    await job_queue.ensure_indexes()
+    backfilled = await backfill_report_student_ids()
+    if backfilled:
+        print(colored(f"  - Added student_id to {backfilled} stored reports", "blue"))
+    
+    if await system.cohort_rollups.needs_rebuild():
+        print(colored("📊 Building cohort rollups from stored reports...", "blue"))
+        built = await system.cohort_rollups.rebuild()
+        print(colored(f"  - {built} cohort rollups built", "blue"))
+    
+    print(colored("🧠 Warming drift framework context cache...", "blue"))
+    await system.drift_agent.get_framework_context()
+    
+    if job_workers.workers:
+        print(colored(f"👷 Starting {job_workers.workers} analysis job workers...", "blue"))
+        job_workers.start()
+    
     print(colored("✅ System ready to accept requests", "green"))
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_workers.stop()
+    for cache in (okr_definition_cache, pillar_cache):
+        await cache.stop_watching()
+    shutdown_retrieval()
+
 @app.get("/health")
 async def health_check():
     try:
@@ -434,6 +725,45 @@ async def health_check():
         print(colored(f"\n❌ Health check failed: {str(e)}", "red"))
         raise HTTPException(status_code=500, detail=str(e))
     
+@app.get("/cache-stats")
+async def cache_stats():
+    return {
+        "tavily": system.tavily_client.cache_stats(),
+        "llm": system.rag_utils.response_cache_stats(),
+        "embeddings": system.rag_utils.embedding_cache_stats()
+    }
+
+@app.get("/diagnostics/query-plans/{student_id}")
+async def query_plans(student_id: int):
+    """Winning plans of the hot queries for one student, to spot collection scans and in-memory sorts"""
+    use_cache = okr_definition_cache.enabled and pillar_cache.enabled
+    try:
+        return {
+            "extraction_pipeline": await explain_aggregate(
+                okr_submissions,
+                system.extractor_agent.build_extraction_pipeline(student_id, 3, with_lookups=not use_cache)
+            ),
+            "source_fingerprint": await explain_find(
+                okr_submissions,
+                {"studentId": student_id, "isActive": True, "isDeleted": False}
+            ),
+            "report_history": await explain_find(
+                drift_reports, {"student_id": student_id}, sort=[("analysis_date", -1)], limit=5
+            ),
+            "report_fingerprint": await explain_find(
+                drift_reports, {"student_id": student_id, "fingerprint": ""},
+                sort=[("analysis_date", -1)], limit=1
+            )
+        }
+    except Exception as e:
+        print(colored(f"\n❌ Query plan check failed: {str(e)}", "red"))
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    body, content_type = metrics.render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/db-status")
 async def check_db_status():
     try:
@@ -1,13 +1,19 @@
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Tuple
 from pydantic import BaseModel, Field
 from enum import Enum
 import motor.motor_asyncio 
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import hashlib
 import os
+import time
 
+from bson import json_util
 import pymongo
 
+from utils.metrics import MongoCommandMetrics
+
 def check_db():
     try:
         client = pymongo.MongoClient("mongodb://localhost:27017")
@@ -101,7 +107,10 @@ class DriftReport(BaseModel):
     pillar_analysis: Dict[str, Any]
 
 # MongoDB connection
-client = motor.motor_asyncio.AsyncIOMotorClient("mongodb://localhost:27017")
+client = motor.motor_asyncio.AsyncIOMotorClient(
+    "mongodb://localhost:27017",
+    event_listeners=[MongoCommandMetrics()]
+)
 db = client["okrion-v2"]  # Changed to okrion_v2 database
 
 # Collections
@@ -109,4 +118,142 @@ okr_definitions = db.okrs
 pillars = db.pillars
 okr_submissions = db.okrsubmissions
 drift_reports = db.drift_reports
-student_collection = db.students
\ No newline at end of file
+student_collection = db.students
+node_checkpoints = db.node_checkpoints
+analysis_jobs = db.analysis_jobs
+cohort_rollups = db.cohort_rollups
+
+class ReferenceCache:
+    """Read-through in-process cache for small, rarely changing lookup collections.
+
+    Entries expire after ``ttl_seconds``; a TTL of 0 disables caching. Entries can
+    be dropped explicitly with invalidate(), or kept fresh by a change-stream
+    listener (requires MongoDB running as a replica set).
+    """
+
+    def __init__(self, collection, ttl_seconds: float = 300):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Any, Tuple[float, Optional[Dict]]] = {}
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _lookup(self, doc_id: Any) -> Tuple[bool, Optional[Dict]]:
+        entry = self._entries.get(doc_id)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return True, entry[1]
+        return False, None
+
+    async def get(self, doc_id: Any) -> Optional[Dict]:
+        """Return one document by _id, reading through to MongoDB on a miss"""
+        return (await self.get_many([doc_id])).get(doc_id)
+
+    async def get_many(self, doc_ids: Iterable[Any]) -> Dict[Any, Optional[Dict]]:
+        """Return documents by _id; all misses are fetched with a single $in query"""
+        found: Dict[Any, Optional[Dict]] = {}
+        missing = []
+        for doc_id in dict.fromkeys(doc_ids):
+            hit, doc = self._lookup(doc_id)
+            if hit:
+                found[doc_id] = doc
+            else:
+                missing.append(doc_id)
+
+        if missing:
+            docs = await self.collection.find({"_id": {"$in": missing}}).to_list(length=None)
+            by_id = {doc["_id"]: doc for doc in docs}
+            now = time.monotonic()
+            for doc_id in missing:
+                found[doc_id] = by_id.get(doc_id)
+                if self.enabled:
+                    self._entries[doc_id] = (now, found[doc_id])
+        return found
+
+    async def version(self, doc_ids: Iterable[Any]) -> str:
+        """Hash of the given documents as this cache currently serves them, so derived
+        results can be keyed on the reference data they were built from"""
+        docs = await self.get_many(doc_ids)
+        payload = json_util.dumps(sorted(docs.items(), key=lambda item: str(item[0])), sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def preload(self):
+        """Load the whole collection into the cache"""
+        if not self.enabled:
+            return
+        docs = await self.collection.find({}).to_list(length=None)
+        now = time.monotonic()
+        self._entries = {doc["_id"]: (now, doc) for doc in docs}
+
+    def invalidate(self, doc_id: Any = None):
+        """Drop one entry, or the whole cache when no id is given"""
+        if doc_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(doc_id, None)
+
+    def start_watching(self):
+        """Refresh entries from a MongoDB change stream in the background"""
+        if self.enabled and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watching(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self):
+        try:
+            async with self.collection.watch(full_document="updateLookup") as stream:
+                async for change in stream:
+                    doc_id = change["documentKey"]["_id"]
+                    if change.get("fullDocument") is not None:
+                        self._entries[doc_id] = (time.monotonic(), change["fullDocument"])
+                    else:
+                        self.invalidate(doc_id)
+        except pymongo.errors.PyMongoError as e:
+            # Standalone servers have no change streams; fall back to TTL expiry
+            print(f"⚠️ Change stream on {self.collection.name} unavailable: {str(e)}")
+            self._watch_task = None
+
+reference_cache_ttl = float(os.getenv("REFERENCE_CACHE_TTL", "300"))
+okr_definition_cache = ReferenceCache(okr_definitions, ttl_seconds=reference_cache_ttl)
+pillar_cache = ReferenceCache(pillars, ttl_seconds=reference_cache_ttl)
+
+# Indexes backing the hot query paths, as (collection, keys, options)
+INDEX_SPECS = [
+    # Extraction pipeline $match + $sort and the source fingerprint lookup
+    (okr_submissions,
+     [("studentId", 1), ("isActive", 1), ("isDeleted", 1), ("monthId", -1)],
+     {"name": "student_active_month"}),
+    # /reports/{student_id}: latest reports first
+    (drift_reports,
+     [("student_id", 1), ("analysis_date", -1)],
+     {"name": "student_analysis_date"}),
+    # Unchanged-input check in analyze_student
+    (drift_reports,
+     [("student_id", 1), ("fingerprint", 1), ("analysis_date", -1)],
+     {"name": "student_fingerprint"}),
+]
+
+async def ensure_indexes():
+    """Create the indexes in INDEX_SPECS; existing identical indexes are left as they are"""
+    for collection, keys, options in INDEX_SPECS:
+        try:
+            await collection.create_index(keys, **options)
+        except pymongo.errors.PyMongoError as e:
+            print(f"⚠️ Could not create index {options.get('name')} on {collection.name}: {str(e)}")
+
+async def backfill_report_student_ids() -> int:
+    """Copy student_info.id to the top-level student_id field on reports stored before it existed"""
+    result = await drift_reports.update_many(
+        {"student_id": {"$exists": False}, "student_info.id": {"$exists": True}},
+        [{"$set": {"student_id": "$student_info.id"}}]
+    )
+    return result.modified_count
@@ -0,0 +1,28 @@
+import importlib
+import os
+import sys
+from unittest import mock
+
+import motor.motor_asyncio
+import pymongo
+from mongomock_motor import AsyncMongoMockClient
+
+# Tests import the backend modules the way main.py does (from the backend directory)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the on-disk caches, which are opened at import time, out of the working tree
+os.environ.setdefault("TAVILY_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+# Never reach Gemini, Tavily or Chroma: the local stand-ins answer instantly
+os.environ.setdefault("FAKE_BACKENDS", "all")
+for name in ("GEMINI", "TAVILY", "CHROMA"):
+    os.environ.setdefault(f"FAKE_{name}_LATENCY", "fixed:0")
+os.environ.setdefault("TAVILY_RATE_LIMIT", "1000")
+
+# models.okr_model runs check_db() on import, which waits out pymongo's 30s server
+# selection timeout when no MongoDB is running, and binds its collections to a
+# module-level client: both are pointed away from a real server here
+with mock.patch.object(pymongo, "MongoClient", side_effect=pymongo.errors.ConnectionFailure("no MongoDB in tests")), \
+        mock.patch.object(motor.motor_asyncio, "AsyncIOMotorClient", lambda *args, **kwargs: AsyncMongoMockClient()):
+    importlib.import_module("models.okr_model")
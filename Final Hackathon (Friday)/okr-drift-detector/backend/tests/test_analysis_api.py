@@ -0,0 +1,160 @@
+"""Report reuse in analyze_student and the framing of the streaming endpoints, on the fake backends."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import main
+from models.okr_model import (
+    drift_reports, okr_definition_cache, okr_definitions, okr_submissions, pillar_cache, pillars,
+    student_collection
+)
+from utils import rag_utils
+
+STUDENT_ID = 4242
+STUDENT = {"_id": STUDENT_ID, "name": "Test Student", "registerNumber": 4242, "department": "CSE",
+           "branchId": 1, "isActive": True, "isDeleted": False}
+OKR_HISTORY = [
+    {"monthId": "2025-03", "pillar": "CLT", "title": "GenAI course", "description": "PrepInsta GenAI course",
+     "status": "completed"},
+    {"monthId": "2025-02", "pillar": "CFC", "title": "Hackathon", "description": "College hackathon project",
+     "status": "completed"}
+]
+
+extract_calls = []
+
+@pytest.fixture(autouse=True)
+def seeded(monkeypatch):
+    async def extract_past_okrs(student_id, cycles=3):
+        extract_calls.append(student_id)
+        # The real pipeline uses $mergeObjects, which mongomock doesn't implement
+        return {
+            "okrs": [dict(okr) for okr in OKR_HISTORY],
+            "student_info": {"id": student_id, "name": STUDENT["name"], "register_number": STUDENT["registerNumber"]}
+        }
+
+    async def seed():
+        await student_collection.delete_many({})
+        await okr_submissions.delete_many({})
+        await drift_reports.delete_many({})
+        await okr_definitions.delete_many({})
+        await pillars.delete_many({})
+        okr_definition_cache.invalidate()
+        pillar_cache.invalidate()
+        await main.system.node_checkpoints.collection.delete_many({})
+        await student_collection.insert_one(dict(STUDENT))
+        await okr_submissions.insert_one({"studentId": STUDENT_ID, "okrId": 1, "pillarId": 1, "monthId": "2025-03",
+                                          "status": "completed", "isActive": True, "isDeleted": False})
+        await okr_definitions.insert_one({"_id": 1, "title": "GenAI course", "description": "PrepInsta GenAI course",
+                                          "okrType": "Value Added Course"})
+        await pillars.insert_one({"_id": 1, "pillarName": "CLT"})
+        await main.system.rag_utils.sync_pillar_data()
+
+    extract_calls.clear()
+    monkeypatch.setattr(main.system.extractor_agent, "extract_past_okrs", extract_past_okrs)
+    asyncio.run(seed())
+
+def analyze(**kwargs):
+    return asyncio.run(main.system.analyze_student(STUDENT_ID, "data scientist", "beginner", **kwargs))
+
+def test_unchanged_inputs_reuse_the_stored_report():
+    first = analyze()
+    assert first["complete"] is True
+    assert analyze()["_id"] == first["_id"]
+
+    assert analyze(force_refresh=True)["_id"] != first["_id"]
+    assert asyncio.run(drift_reports.count_documents({"student_id": STUDENT_ID})) == 2
+
+def test_changed_or_degraded_inputs_rerun():
+    first = analyze()
+
+    asyncio.run(okr_submissions.insert_one({"studentId": STUDENT_ID, "okrId": 2, "pillarId": 2, "monthId": "2025-03",
+                                            "status": "completed", "isActive": True, "isDeleted": False}))
+    second = analyze()
+    assert second["_id"] != first["_id"] and second["fingerprint"] != first["fingerprint"]
+
+    # Degraded reports (LLM errors, unparsed drift JSON, no search results) are never reused
+    asyncio.run(drift_reports.update_many({}, {"$set": {"complete": False}}))
+    assert analyze()["_id"] != second["_id"]
+
+def test_reference_data_and_kb_changes_rerun_extraction():
+    first = analyze()
+    assert analyze()["_id"] == first["_id"]
+    assert len(extract_calls) == 1
+
+    # An edited definition is picked up once the cache drops it (change stream or TTL)
+    asyncio.run(okr_definitions.update_one({"_id": 1}, {"$set": {"title": "GenAI specialization"}}))
+    okr_definition_cache.invalidate(1)
+    second = analyze()
+    assert second["_id"] != first["_id"] and len(extract_calls) == 2
+
+    asyncio.run(pillars.update_one({"_id": 1}, {"$set": {"pillarName": "CLT-2"}}))
+    pillar_cache.invalidate(1)
+    third = analyze()
+    assert third["_id"] != second["_id"] and len(extract_calls) == 3
+
+    main.system.rag_utils.kb_version = "resynced"
+    assert analyze()["_id"] != third["_id"]
+    assert len(extract_calls) == 4
+
+def post(path, payload):
+    async def run():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post(path, json=payload)
+    return asyncio.run(run())
+
+def parse_sse(body):
+    frames = body.split("\n\n")
+    assert frames[-1] == ""
+    events = []
+    for frame in frames[:-1]:
+        event_line, data_line = frame.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        data = json.loads(data_line[len("data: "):])
+        assert data["event"] == event_line[len("event: "):]
+        events.append(data)
+    return events
+
+def test_stream_sends_one_event_per_node_then_the_report():
+    response = post("/analyze/stream", {"student_id": STUDENT_ID, "quarterly_goal": "data scientist"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    assert events[0]["event"] == "analysis_start"
+    assert events[-1]["event"] == "complete"
+    assert events[-1]["report"]["student_id"] == STUDENT_ID
+    nodes = {node.value for node in main.NodeType}
+    assert {e["node"] for e in events if e["event"] == "node_start"} == nodes
+    assert {e["node"] for e in events if e["event"] == "node_end"} == nodes
+
+def test_stream_reports_errors_as_an_event():
+    events = parse_sse(post("/analyze/stream", {"student_id": 1}).text)
+    assert [(e["event"], e.get("detail")) for e in events] == [("error", "Student not found")]
+
+def test_batch_streams_one_line_per_student():
+    response = post("/analyze/batch", {"student_ids": [STUDENT_ID, 1, STUDENT_ID]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+
+    lines = {line["student_id"]: line for line in map(json.loads, response.text.splitlines())}
+    assert set(lines) == {STUDENT_ID, 1}
+    assert lines[STUDENT_ID]["status"] == "completed"
+    assert lines[STUDENT_ID]["report"]["student_id"] == STUDENT_ID
+    assert lines[1] == {"student_id": 1, "status": "failed", "error": "Student not found"}
+
+    assert post("/analyze/batch", {}).status_code == 400
+
+def test_shutdown_releases_retrieval_threads():
+    analyze(force_refresh=True)
+    threads = list(rag_utils._retrieval_executor._executor._threads)
+    assert threads
+
+    asyncio.run(main.shutdown_event())
+    for thread in threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+    # A later lifespan (reload, next test) gets fresh workers
+    assert analyze(force_refresh=True)["complete"] is True
@@ -0,0 +1,86 @@
+"""Expiry, eviction and tiering of the response and search caches."""
+import asyncio
+
+import pytest
+
+from utils import cache_store
+from utils.cache_store import LRUCache, PersistentTTLCache, TieredCache
+
+class Clock:
+    """Stands in for time.time() inside cache_store"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_store.time, "time", clock.time)
+    return clock
+
+def test_persistent_entries_expire_after_ttl(tmp_path, clock):
+    cache = PersistentTTLCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    cache.set("a", {"value": [1, 2]})
+
+    clock.now += 59
+    assert cache.get("a") == {"value": [1, 2]}
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_persistent_cache_evicts_least_recently_read(tmp_path, clock):
+    cache = PersistentTTLCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=None, max_entries=3)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.set(key, key)
+
+    # Read times are buffered, and must still decide the eviction order
+    clock.now += 1
+    assert cache.get("a") == "a"
+    clock.now += 1
+    cache.set("d", "d")
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["a", "c", "d"]
+    assert cache.stats()["size"] == 3
+
+def test_persistent_cache_survives_reopen(tmp_path, clock):
+    path = str(tmp_path / "nested" / "cache.sqlite3")
+    PersistentTTLCache(path, ttl_seconds=None).set("a", 1)
+    assert PersistentTTLCache(path, ttl_seconds=None).get("a") == 1
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["size"] == 2
+
+def test_tiered_cache_promotes_persistent_hits(tmp_path, clock):
+    persistent = PersistentTTLCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=None)
+    persistent.set("a", "from disk")
+    cache = TieredCache(LRUCache(4), persistent)
+
+    async def run():
+        assert await cache.aget("a") == "from disk"
+        assert cache.memory.get("a") == "from disk"
+        await cache.aset("b", "both")
+        assert persistent.get("b") == "both"
+        assert await cache.aget("missing") is None
+
+    asyncio.run(run())
+    assert cache.stats()["persistent"]["hits"] == 2
+
+def test_tiered_cache_without_persistent_tier():
+    cache = TieredCache(LRUCache(4))
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats()["persistent"] is None
@@ -0,0 +1,53 @@
+"""Each agent's real prompt must get the reply shape that agent parses from the fake model."""
+import asyncio
+import json
+
+import pytest
+
+from agents.coach_agent import CoachingAgent
+from agents.drift_agent import DriftDetectorAgent
+from agents.pattern_agent import PatternClassifierAgent
+from agents.trajectory_agent import TrajectoryMapperAgent
+from utils.fake_backends import FakeGenerativeModel
+from utils.rag_utils import GeminiRAGUtils
+
+OKR_DATA = {
+    "okrs": [
+        {"monthId": "2025-03", "pillar": "CLT", "title": "GenAI course",
+         "description": "Complete the PrepInsta GenAI course", "status": "completed"},
+        {"monthId": "2025-02", "pillar": "CFC", "title": "Hackathon",
+         "description": "Build a project at a college hackathon", "status": "in_progress"},
+        {"monthId": "2025-01", "pillar": "SCD", "title": "LeetCode Problems",
+         "description": "Solve 50 programming problems", "status": "completed"}
+    ]
+}
+
+@pytest.fixture
+def rag_utils(monkeypatch):
+    monkeypatch.setenv("FAKE_BACKENDS", "all")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    for name in ("GEMINI", "CHROMA"):
+        monkeypatch.setenv(f"FAKE_{name}_LATENCY", "fixed:0")
+    rag = GeminiRAGUtils()
+    asyncio.run(rag.sync_pillar_data())
+    return rag
+
+def test_agent_prompts_get_their_reply_shape(rag_utils):
+    async def run():
+        trajectory = await TrajectoryMapperAgent(rag_utils).map_trajectory(OKR_DATA, "data scientist")
+        drift = await DriftDetectorAgent(rag_utils).detect_drift(trajectory, OKR_DATA, "data scientist")
+        pattern = await PatternClassifierAgent(rag_utils).classify_patterns(drift, trajectory, "data scientist")
+        ideas = await CoachingAgent(rag_utils, tavily_client=object())._generate_project_ideas(
+            "data scientist", "beginner"
+        )
+        return trajectory, drift, pattern, ideas
+
+    trajectory, drift, pattern, ideas = asyncio.run(run())
+
+    assert trajectory.startswith("1. Synthetic recommendation")
+    assert drift["drift_level"] in FakeGenerativeModel.DRIFT_LEVELS
+    assert drift["reasoning"] != DriftDetectorAgent.PARSE_FAILED_REASONING
+    assert PatternClassifierAgent.primary_pattern(pattern) in PatternClassifierAgent.PATTERNS
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(pattern)
+    assert ideas[0].startswith("1. Synthetic recommendation")
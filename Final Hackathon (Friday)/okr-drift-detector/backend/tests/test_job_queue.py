@@ -0,0 +1,147 @@
+"""Lease, retry and cancellation behaviour of the MongoDB job queue and its worker pool."""
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from utils.job_queue import AnalysisJobQueue, JobWorkerPool
+
+def make_queue(**kwargs):
+    return AnalysisJobQueue(AsyncMongoMockClient()["jobs_test"].analysis_jobs, **kwargs)
+
+async def expire_lease(queue, job_id):
+    await queue.collection.update_one(
+        {"_id": job_id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+async def wait_for_status(queue, job_id, status, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        assert asyncio.get_running_loop().time() < deadline, f"job stayed {job['status']}"
+        await asyncio.sleep(0.01)
+
+def test_claim_leases_oldest_job_once():
+    async def run():
+        queue = make_queue()
+        first = await queue.enqueue({"n": 1})
+        second = await queue.enqueue({"n": 2})
+
+        job = await queue.claim("w1")
+        assert job["_id"] == first
+        assert job["attempts"] == 1 and job["worker"] == "w1"
+        assert (await queue.claim("w2"))["_id"] == second
+        assert await queue.claim("w3") is None
+
+        await queue.complete(first, "w1", {"ok": True})
+        done = await queue.get(first)
+        assert done["status"] == "completed" and done["result"] == {"ok": True}
+        assert "lease_expires_at" not in done and done["finished_at"]
+    asyncio.run(run())
+
+def test_expired_lease_is_retried_until_max_attempts():
+    async def run():
+        queue = make_queue(max_attempts=2)
+        job_id = await queue.enqueue({})
+
+        assert (await queue.claim("w1"))["attempts"] == 1
+        await expire_lease(queue, job_id)
+        retried = await queue.claim("w2")
+        assert retried["_id"] == job_id and retried["attempts"] == 2 and retried["worker"] == "w2"
+
+        # The first worker lost the job: its renewal and completion are ignored
+        assert not await queue.renew(job_id, "w1")
+        await queue.complete(job_id, "w1", {"stale": True})
+        assert (await queue.get(job_id))["status"] == "running"
+
+        await expire_lease(queue, job_id)
+        assert await queue.claim("w3") is None
+        failed = await queue.get(job_id)
+        assert failed["status"] == "failed"
+        assert failed["error"] == "Lease expired after 2 attempts"
+    asyncio.run(run())
+
+def test_release_returns_job_without_counting_the_attempt():
+    async def run():
+        queue = make_queue()
+        job_id = await queue.enqueue({})
+        await queue.claim("w1")
+        await queue.release(job_id, "w1")
+
+        job = await queue.get(job_id)
+        assert job["status"] == "queued" and job["attempts"] == 0
+        assert "worker" not in job and "lease_expires_at" not in job
+    asyncio.run(run())
+
+def test_pool_completes_and_fails_jobs():
+    async def handler(payload):
+        if payload.get("fail"):
+            raise ValueError("bad payload")
+        return {"echo": payload["n"]}
+
+    async def run():
+        queue = make_queue()
+        pool = JobWorkerPool(queue, handler, workers=2, poll_interval=0.01)
+        ok = await queue.enqueue({"n": 7})
+        bad = await queue.enqueue({"fail": True})
+        pool.start()
+        try:
+            assert (await wait_for_status(queue, ok, "completed"))["result"] == {"echo": 7}
+            assert (await wait_for_status(queue, bad, "failed"))["error"] == "bad payload"
+        finally:
+            await pool.stop()
+    asyncio.run(run())
+
+def test_lost_lease_cancels_handler_and_leaves_job_alone():
+    async def run():
+        cancelled = asyncio.Event()
+        started = asyncio.Event()
+
+        async def handler(payload):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return {}
+
+        # Renewals every lease_seconds / 3
+        queue = make_queue(lease_seconds=1)
+        pool = JobWorkerPool(queue, handler, workers=1, poll_interval=0.01)
+        job_id = await queue.enqueue({})
+        pool.start()
+        try:
+            await asyncio.wait_for(started.wait(), 5)
+            # Another worker takes the job over after an expired lease
+            await queue.collection.update_one({"_id": job_id}, {"$set": {"worker": "other", "attempts": 2}})
+            await asyncio.wait_for(cancelled.wait(), 5)
+            await asyncio.sleep(0.05)
+
+            job = await queue.get(job_id)
+            assert job["status"] == "running" and job["worker"] == "other" and job["attempts"] == 2
+        finally:
+            await pool.stop()
+    asyncio.run(run())
+
+def test_stop_releases_the_running_job():
+    async def run():
+        started = asyncio.Event()
+
+        async def handler(payload):
+            started.set()
+            await asyncio.sleep(60)
+            return {}
+
+        queue = make_queue()
+        pool = JobWorkerPool(queue, handler, workers=1, poll_interval=0.01)
+        job_id = await queue.enqueue({})
+        pool.start()
+        await asyncio.wait_for(started.wait(), 5)
+        await pool.stop()
+
+        job = await queue.get(job_id)
+        assert job["status"] == "queued" and job["attempts"] == 0
+    asyncio.run(run())
@@ -0,0 +1,67 @@
+"""Node outputs are replayed only for identical inputs."""
+import asyncio
+from datetime import datetime
+
+from mongomock_motor import AsyncMongoMockClient
+
+from utils.node_checkpoints import NodeCheckpointStore
+
+STATE = {
+    "student_id": 7,
+    "okr_history": [{"pillar": "CLT", "submittedOn": datetime(2025, 1, 2)}],
+    "quarterly_goal": "data scientist",
+    "force_refresh": False
+}
+
+def make_store():
+    return NodeCheckpointStore(AsyncMongoMockClient()["checkpoints_test"].node_checkpoints)
+
+def test_key_depends_only_on_node_and_listed_inputs():
+    key = NodeCheckpointStore.make_key("map_trajectory", STATE, ["okr_history", "quarterly_goal"])
+
+    reordered = dict(reversed(list(STATE.items())))
+    assert NodeCheckpointStore.make_key("map_trajectory", reordered, ["quarterly_goal", "okr_history"]) == key
+    # Inputs the node doesn't read don't matter
+    assert NodeCheckpointStore.make_key(
+        "map_trajectory", {**STATE, "force_refresh": True, "student_id": 8}, ["okr_history", "quarterly_goal"]
+    ) == key
+
+    assert NodeCheckpointStore.make_key("detect_drift", STATE, ["okr_history", "quarterly_goal"]) != key
+    assert NodeCheckpointStore.make_key(
+        "map_trajectory", {**STATE, "quarterly_goal": "designer"}, ["okr_history", "quarterly_goal"]
+    ) != key
+    changed_history = [{"pillar": "CLT", "submittedOn": datetime(2025, 1, 3)}]
+    assert NodeCheckpointStore.make_key(
+        "map_trajectory", {**STATE, "okr_history": changed_history}, ["okr_history", "quarterly_goal"]
+    ) != key
+
+def test_saved_output_is_replayed():
+    async def run():
+        store = make_store()
+        key = store.make_key("detect_drift", STATE, ["okr_history"])
+        assert await store.load(key) is None
+
+        await store.save(key, "detect_drift", {"drift_report": {"drift_level": "Low"}}, student_id=7)
+        assert await store.load(key) == {"drift_report": {"drift_level": "Low"}}
+
+        # A rerun with the same inputs replaces the entry rather than adding one
+        await store.save(key, "detect_drift", {"drift_report": {"drift_level": "High"}}, student_id=8)
+        assert await store.load(key) == {"drift_report": {"drift_level": "High"}}
+        docs = await store.collection.find().to_list(length=None)
+        assert len(docs) == 1
+        assert docs[0]["node"] == "detect_drift" and docs[0]["student_id"] == 8 and docs[0]["created_at"]
+    asyncio.run(run())
+
+def test_storage_errors_degrade_to_a_miss():
+    class BrokenCollection:
+        async def find_one(self, *args, **kwargs):
+            raise RuntimeError("connection reset")
+
+        async def replace_one(self, *args, **kwargs):
+            raise RuntimeError("connection reset")
+
+    async def run():
+        store = NodeCheckpointStore(BrokenCollection())
+        await store.save("key", "extract_okrs", {"okr_history": []})
+        assert await store.load("key") is None
+    asyncio.run(run())
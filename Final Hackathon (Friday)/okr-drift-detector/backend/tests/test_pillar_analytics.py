@@ -0,0 +1,72 @@
+"""PillarAnalyticsEngine must score exactly like the per-OKR loop it replaced."""
+import random
+
+from utils.pillar_analytics import FOCUS_KEYWORDS, PILLARS, PillarAnalyticsEngine
+
+def reference_pillar_analysis(okr_history):
+    """OKRDriftDetectorSystem._generate_pillar_analysis before the analytics engine"""
+    pillar_scores = {p: {"score": 0, "focus": "", "completion": 0, "trend": "stable"} for p in PILLARS}
+    pillar_counts = {p: 0 for p in PILLARS}
+    pillar_focus = {p: {} for p in PILLARS}
+
+    for okr in okr_history:
+        pillar = okr.get("pillar")
+        if pillar in pillar_counts:
+            pillar_counts[pillar] += 1
+            focus_text = okr.get("title", "").lower() + " " + okr.get("description", "").lower()
+            for keyword in FOCUS_KEYWORDS.get(pillar, []):
+                if keyword in focus_text:
+                    pillar_focus[pillar][keyword] = pillar_focus[pillar].get(keyword, 0) + 1
+
+    total_okrs = len(okr_history)
+    for pillar, count in pillar_counts.items():
+        if total_okrs > 0:
+            score = min(100, int((count / total_okrs) * 100 * 2))
+            pillar_scores[pillar]["score"] = score
+            pillar_scores[pillar]["completion"] = score
+            if pillar_focus[pillar]:
+                pillar_scores[pillar]["focus"] = max(pillar_focus[pillar].items(), key=lambda x: x[1])[0].title()
+            else:
+                pillar_scores[pillar]["focus"] = "General"
+            if score > 60:
+                pillar_scores[pillar]["trend"] = "up"
+            elif score < 40:
+                pillar_scores[pillar]["trend"] = "down"
+    return pillar_scores
+
+def reference_readiness_score(okr_history):
+    """OKRDriftDetectorSystem._calculate_readiness_score before the analytics engine"""
+    relevant_okrs = [okr for okr in okr_history if okr.get("pillar") in ["CLT", "CFC", "SCD"]]
+    return min(100, len(relevant_okrs) * 10)
+
+# Keywords, fragments of them and words that contain them, so matches overlap,
+# straddle word boundaries and show up in either case
+KEYWORDS = [keyword for keywords in FOCUS_KEYWORDS.values() for keyword in keywords]
+VOCABULARY = KEYWORDS + [
+    "courses", "connection", "projects", "Hackathons", "LEETCODE", "design", "thinking",
+    "product", "management", "gen", "ai", "net", "work", "the", "and", "plan", "\n", ""
+]
+
+def random_text(rng):
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(0, 8))]
+    return rng.choice([" ", "", "-"]).join(words)
+
+def random_history(rng):
+    return [
+        {
+            "pillar": rng.choice(PILLARS + ["OTHER", None]),
+            "title": random_text(rng),
+            "description": random_text(rng)
+        }
+        for _ in range(rng.randint(0, 14))
+    ]
+
+def test_analyze_matches_reference():
+    rng = random.Random(22)
+    engine = PillarAnalyticsEngine()
+    histories = [random_history(rng) for _ in range(3000)]
+
+    for history in histories:
+        result = engine.analyze(history)
+        assert result["pillar_analysis"] == reference_pillar_analysis(history)
+        assert result["readiness_score"] == reference_readiness_score(history)
@@ -0,0 +1,56 @@
+"""History and context trimming in PromptBuilder."""
+from datetime import datetime
+
+from utils.prompt_builder import PromptBuilder
+
+def okr(month, title, description="x" * 120):
+    return {
+        "monthId": month, "pillar": "CLT", "title": title, "description": description,
+        "status": "completed", "submittedOn": datetime(2025, int(month[-2:]), 5),
+        "metadata": {"okrType": "Value Added Course"},
+        "activities": [{"certificate": "cert.pdf", "leetcode": None}]
+    }
+
+HISTORY = [okr("2025-01", "Oldest"), okr("2025-03", "Newest"), okr("2025-02", "Middle")]
+
+def test_compact_okr_keeps_prompt_fields():
+    compact = PromptBuilder(description_chars=10).compact_okr(okr("2025-03", "GenAI course"))
+    assert compact == {
+        "month": "2025-03", "pillar": "CLT", "title": "GenAI course", "type": "Value Added Course",
+        "status": "completed", "submitted": "2025-03-05", "evidence": ["certificate"],
+        "description": "xxxxxxxxxx…"
+    }
+
+def test_history_within_budget_is_newest_first_and_untrimmed():
+    lines = PromptBuilder(history_token_budget=10_000).format_history(HISTORY).splitlines()
+    assert [line.split('"title":"')[1].split('"')[0] for line in lines] == ["Newest", "Middle", "Oldest"]
+    assert all('"description"' in line for line in lines)
+
+def test_oldest_descriptions_go_first():
+    builder = PromptBuilder(history_token_budget=10_000)
+    full = sum(builder.estimate_tokens(line) for line in builder.format_history(HISTORY).splitlines())
+    per_description = builder.estimate_tokens('"description":"' + "x" * 120 + '",')
+
+    lines = PromptBuilder(history_token_budget=full - per_description).format_history(HISTORY).splitlines()
+    assert len(lines) == 3
+    assert '"description"' not in lines[2]
+    assert '"description"' in lines[0] and '"description"' in lines[1]
+
+def test_oldest_okrs_are_dropped_but_never_the_newest_month():
+    history = HISTORY + [okr("2025-03", "Newest too")]
+    lines = PromptBuilder(history_token_budget=1).format_history(history).splitlines()
+
+    assert lines[-1] == "(2 older OKRs omitted)"
+    assert len(lines) == 3
+    assert all('"month":"2025-03"' in line and '"description"' not in line for line in lines[:2])
+
+def test_contexts_are_deduplicated_and_budgeted():
+    contexts = [
+        {"content": "a" * 40, "metadata": {}},
+        {"content": "a" * 40, "metadata": {}},
+        {"content": "b" * 40, "metadata": {}},
+        {"content": "c" * 40, "metadata": {}}
+    ]
+    assert PromptBuilder(context_token_budget=25).select_contexts(contexts) == [contexts[0], contexts[2]]
+    # The first context is kept even when it alone is over budget
+    assert PromptBuilder(context_token_budget=1).select_contexts(contexts) == [contexts[0]]
@@ -0,0 +1,47 @@
+"""Retrieval worker threads are released on shutdown and restarted on demand."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils import metrics
+from utils.retrieval_executor import RetrievalExecutor
+
+def queue_depth():
+    return metrics.RETRIEVAL_QUEUE_DEPTH._value.get()
+
+def test_shutdown_stops_threads_and_next_query_restarts_them():
+    executor = RetrievalExecutor(workers=2)
+
+    async def run():
+        return await asyncio.gather(*(executor.run(pow, n, 2) for n in range(4)))
+
+    assert asyncio.run(run()) == [0, 1, 4, 9]
+    threads = list(executor._executor._threads)
+    executor.shutdown()
+    for thread in threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+    # The executor outlives an app lifespan: the next query starts a new pool
+    assert asyncio.run(run()) == [0, 1, 4, 9]
+    executor.shutdown()
+
+def test_shutdown_cancels_queued_queries_without_leaking_queue_depth():
+    executor = RetrievalExecutor(workers=1)
+    release = threading.Event()
+    depth_before = queue_depth()
+
+    async def run():
+        running = asyncio.ensure_future(executor.run(release.wait, 5))
+        queued = asyncio.ensure_future(executor.run(time.sleep, 0))
+        await asyncio.sleep(0.05)
+        executor.shutdown()
+        release.set()
+        assert await running is True
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+    asyncio.run(run())
+    assert queue_depth() == depth_before
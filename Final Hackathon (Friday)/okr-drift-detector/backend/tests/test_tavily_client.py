@@ -0,0 +1,69 @@
+"""Rate limiting and result caching of Tavily searches."""
+import asyncio
+import threading
+import time
+
+from utils.cache_store import PersistentTTLCache
+from utils.tavily_client import AsyncTokenBucket, TavilySearch
+
+def burst(bucket, count):
+    async def run():
+        await asyncio.gather(*(bucket.acquire() for _ in range(count)))
+    asyncio.run(run())
+
+def test_bucket_is_shared_across_event_loops_and_threads():
+    bucket = AsyncTokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    burst(bucket, 3)
+    burst(bucket, 3)
+    threads = [threading.Thread(target=burst, args=(bucket, 3)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 12 tokens at 50/s, one of them available up front
+    assert time.monotonic() - started >= 11 / 50 * 0.9
+
+def test_cancelled_waiter_returns_its_token():
+    async def run():
+        bucket = AsyncTokenBucket(rate=10, capacity=1)
+        await bucket.acquire()
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        # Only the cancelled waiter's slot was freed: the next caller waits one
+        # interval from the first acquire, not two
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.15
+
+def test_search_cache_is_skipped_but_refreshed_on_use_cache_false(tmp_path):
+    search = TavilySearch()
+    search.cache = PersistentTTLCache(str(tmp_path / "tavily.sqlite3"), table="tavily_results")
+    queries = []
+    fake_search = search.client.search
+
+    def counting_search(query, **kwargs):
+        queries.append(query)
+        return fake_search(query, **kwargs)
+
+    search.client.search = counting_search
+
+    async def run():
+        first = await search.search("genai hackathon")
+        assert await search.search("genai hackathon") == first
+        assert len(queries) == 1
+
+        # A forced refresh searches again and stores what it found
+        search.cache.set(PersistentTTLCache.make_key(*search.cache_scope, "genai hackathon", 3), ["stale"])
+        assert await search.search("genai hackathon", use_cache=False) == first
+        assert len(queries) == 2
+        assert await search.search("genai hackathon") == first
+        assert len(queries) == 2
+
+    asyncio.run(run())
@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class PersistentTTLCache:
+    """SQLite-backed key/value cache with TTL expiry, size-bounded eviction and hit/miss counters.
+
+    Values must be JSON-serializable. When the table grows past ``max_entries`` the
+    least recently read entries are evicted. A ``ttl_seconds`` of None never expires.
+    Read times are buffered and written in batches, so a hit is a single SELECT.
+    From async code use aget/aset, which run the SQLite work off the event loop.
+    """
+
+    # Buffered read times are written once this many are pending, or this old
+    TOUCH_BATCH_SIZE = 256
+    TOUCH_FLUSH_SECONDS = 30.0
+
+    def __init__(self, path: str, table: str = "cache", ttl_seconds: Optional[float] = 86400,
+                 max_entries: int = 10000):
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._touched_flushed_at = time.time()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Stable content hash of the given JSON-serializable parts"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._touched[key] = now
+            if len(self._touched) >= self.TOUCH_BATCH_SIZE or \
+                    now - self._touched_flushed_at >= self.TOUCH_FLUSH_SECONDS:
+                self._flush_touched()
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    async def aget(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any):
+        await asyncio.to_thread(self.set, key, value)
+
+    def _flush_touched(self):
+        # Caller holds the lock and commits
+        if self._touched:
+            self._conn.executemany(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+        self._touched_flushed_at = time.time()
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), now, now)
+            )
+            overflow = self._size() - self.max_entries
+            if overflow > 0:
+                # Eviction order needs the buffered read times
+                self._flush_touched()
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,)
+                )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._touched.pop(key, None)
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def _size(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = self._size()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with hit/miss counters"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries
+        }
+
+class TieredCache:
+    """In-memory LRU in front of an optional persistent tier; persistent hits are promoted"""
+
+    def __init__(self, memory: LRUCache, persistent: Optional[PersistentTTLCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.persistent:
+            value = self.persistent.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.persistent:
+            self.persistent.set(key, value)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get for async callers: memory hits stay inline, the persistent tier runs off the loop"""
+        value = self.memory.get(key)
+        if value is None and self.persistent:
+            value = await self.persistent.aget(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    async def aset(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.persistent:
+            await self.persistent.aset(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "persistent": self.persistent.stats() if self.persistent else None
+        }
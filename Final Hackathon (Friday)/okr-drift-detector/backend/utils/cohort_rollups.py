@@ -0,0 +1,181 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo.errors import DuplicateKeyError
+
+from agents.pattern_agent import PatternClassifierAgent
+from models.okr_model import cohort_rollups, drift_reports, student_collection
+
+DRIFT_LEVELS = ["Low", "Medium", "High"]
+# Fields of a report that contribution() reads
+CONTRIBUTION_PROJECTION = {
+    "student_id": 1, "analysis_date": 1, "drift_analysis.drift_level": 1,
+    "pattern_analysis": 1, "goal_analysis.readiness_score": 1, "pillar_analysis": 1
+}
+
+class CohortRollupStore:
+    """Running aggregates of drift reports per department and branch, per month and overall.
+
+    Each rollup document counts every student's latest report once, and records
+    which report that is under ``members.<student_id>``. A new report adds its
+    contribution and subtracts that of the counted report in one update that is
+    conditional on ``members.<student_id>`` being unchanged, so concurrent analyses
+    of the same student can't subtract the same report twice; the loser rereads
+    and retries. A summary is a single _id lookup.
+    Rollup ids are ``department:<name>:<YYYY-MM|all>`` and ``branch:<id>:<YYYY-MM|all>``.
+    """
+
+    MAX_RETRIES = 10
+
+    def __init__(self, collection=cohort_rollups, reports=drift_reports, students=student_collection):
+        self.collection = collection
+        self.reports = reports
+        self.students = students
+
+    @staticmethod
+    def contribution(report: Dict[str, Any]) -> Dict[str, float]:
+        """The fields one report adds to a rollup"""
+        level = str((report.get("drift_analysis") or {}).get("drift_level", "")).strip().capitalize()
+        pattern = PatternClassifierAgent.primary_pattern(report.get("pattern_analysis"))
+        fields = {
+            "students": 1,
+            f"drift_levels.{level if level in DRIFT_LEVELS else 'Unknown'}": 1,
+            f"patterns.{pattern}": 1,
+            "readiness_sum": (report.get("goal_analysis") or {}).get("readiness_score", 0)
+        }
+        for pillar, scores in (report.get("pillar_analysis") or {}).items():
+            fields[f"pillar_score_sums.{pillar}"] = scores.get("score", 0)
+        return fields
+
+    @staticmethod
+    def cohort_keys(student: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        keys = []
+        if student.get("department"):
+            keys.append(("department", student["department"]))
+        if student.get("branchId") is not None:
+            keys.append(("branch", student["branchId"]))
+        return keys
+
+    @staticmethod
+    def rollup_id(kind: str, value: Any, month: str) -> str:
+        return f"{kind}:{value}:{month}"
+
+    @staticmethod
+    def member(report: Dict[str, Any]) -> Dict[str, Any]:
+        """What a rollup stores about the report it counts for a student"""
+        return {"report": report["_id"], "date": report["analysis_date"]}
+
+    async def record(self, report: Dict[str, Any], student: Dict[str, Any]):
+        """Fold a newly inserted report into its student's cohort rollups"""
+        try:
+            month = report["analysis_date"].strftime("%Y-%m")
+            for kind, value in self.cohort_keys(student):
+                for bucket in (month, "all"):
+                    await self._fold(self.rollup_id(kind, value, bucket), kind, value, bucket, report)
+        except Exception as e:
+            print(f"⚠️ Cohort rollup update failed for student {report.get('student_id')}: {str(e)}")
+
+    async def _fold(self, rollup_id: str, kind: str, value: Any, bucket: str, report: Dict[str, Any]):
+        member_path = f"members.{report['student_id']}"
+        for _ in range(self.MAX_RETRIES):
+            doc = await self.collection.find_one({"_id": rollup_id}, {member_path: 1})
+            counted = ((doc or {}).get("members") or {}).get(str(report["student_id"]))
+            if counted and counted["date"] >= report["analysis_date"]:
+                return  # A newer report is already counted
+            
+            delta = self.contribution(report)
+            if counted:
+                previous = await self.reports.find_one({"_id": counted["report"]}, CONTRIBUTION_PROJECTION)
+                for field, amount in (self.contribution(previous) if previous else {}).items():
+                    delta[field] = delta.get(field, 0) - amount
+            
+            update = {
+                "$inc": delta,
+                "$set": {"kind": kind, "value": value, "month": bucket,
+                         "updated_at": datetime.utcnow(), member_path: self.member(report)}
+            }
+            condition = {f"{member_path}.report": counted["report"]} if counted else {member_path: {"$exists": False}}
+            try:
+                result = await self.collection.update_one(
+                    {"_id": rollup_id, **condition}, update, upsert=doc is None
+                )
+            except DuplicateKeyError:
+                continue  # Another writer created the rollup first
+            if result.matched_count or result.upserted_id is not None:
+                return
+            # The counted report changed since it was read: reread and retry
+        print(f"⚠️ Gave up folding report into {rollup_id} after {self.MAX_RETRIES} conflicts")
+
+    async def summary(self, kind: str, value: Any, month: str = "all") -> Optional[Dict[str, Any]]:
+        doc = await self.collection.find_one({"_id": self.rollup_id(kind, value, month)}, {"members": 0})
+        if not doc:
+            return None
+
+        students = doc.get("students", 0)
+        return {
+            "cohort": f"{kind}:{value}",
+            "month": month,
+            "students": students,
+            "drift_levels": {k: v for k, v in doc.get("drift_levels", {}).items() if v},
+            "patterns": {k: v for k, v in doc.get("patterns", {}).items() if v},
+            "average_pillar_scores": {
+                pillar: round(total / students, 1) if students else 0
+                for pillar, total in doc.get("pillar_score_sums", {}).items()
+            },
+            "average_readiness": round(doc.get("readiness_sum", 0) / students, 1) if students else 0,
+            "updated_at": doc.get("updated_at")
+        }
+
+    async def needs_rebuild(self) -> bool:
+        """True when reports exist but the rollups are missing, or predate member tracking"""
+        if await self.collection.find_one({"members": {"$exists": False}}, {"_id": 1}):
+            return True
+        return not await self.collection.estimated_document_count() and \
+            bool(await self.reports.estimated_document_count())
+
+    async def rebuild(self) -> int:
+        """Recompute every rollup from the stored reports (for reports made before rollups existed)"""
+        latest: Dict[Tuple[Any, str], Dict[str, Any]] = {}
+        cursor = self.reports.find(
+            {"student_id": {"$exists": True}}, CONTRIBUTION_PROJECTION
+        ).sort([("student_id", 1), ("analysis_date", 1)])
+        async for report in cursor:
+            # Later reports overwrite earlier ones: the latest per month and overall
+            latest[(report["student_id"], report["analysis_date"].strftime("%Y-%m"))] = report
+            latest[(report["student_id"], "all")] = report
+
+        student_ids = list({student_id for student_id, _ in latest})
+        students = {
+            doc["_id"]: doc
+            for doc in await self.students.find(
+                {"_id": {"$in": student_ids}}, {"department": 1, "branchId": 1}
+            ).to_list(length=None)
+        }
+
+        rollups: Dict[str, Dict[str, Any]] = {}
+        for (student_id, bucket), report in latest.items():
+            for kind, value in self.cohort_keys(students.get(student_id, {})):
+                rollup = rollups.setdefault(self.rollup_id(kind, value, bucket), {
+                    "kind": kind, "value": value, "month": bucket, "totals": {}, "members": {}
+                })
+                rollup["members"][str(student_id)] = self.member(report)
+                for field, amount in self.contribution(report).items():
+                    rollup["totals"][field] = rollup["totals"].get(field, 0) + amount
+
+        now = datetime.utcnow()
+        await self.collection.delete_many({})
+        if rollups:
+            await self.collection.insert_many([
+                {"_id": rollup_id, "kind": r["kind"], "value": r["value"], "month": r["month"],
+                 "updated_at": now, "members": r["members"], **self._nest(r["totals"])}
+                for rollup_id, r in rollups.items()
+            ])
+        return len(rollups)
+
+    @staticmethod
+    def _nest(totals: Dict[str, float]) -> Dict[str, Any]:
+        """Expand dotted $inc paths into nested fields for insert"""
+        doc: Dict[str, Any] = {}
+        for field, amount in totals.items():
+            parent, _, leaf = field.rpartition(".")
+            (doc.setdefault(parent, {}) if parent else doc)[leaf] = amount
+        return doc
@@ -0,0 +1,45 @@
+from typing import Any, Dict, List, Optional
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from utils.cache_store import PersistentTTLCache, TieredCache
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Chroma embedding function that serves repeated texts from a content-hash-keyed cache.
+
+    Keys combine the upstream function's identity with the text, so switching
+    embedding models never returns stale vectors. All misses in a call are sent
+    to the upstream function as one batch.
+    """
+
+    def __init__(self, upstream: EmbeddingFunction, cache: TieredCache):
+        self.upstream = upstream
+        self.cache = cache
+        self.model_id = "{}:{}".format(
+            type(upstream).__name__,
+            getattr(upstream, "_model_name", None) or getattr(upstream, "model_name", "")
+        )
+
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [PersistentTTLCache.make_key(self.model_id, text) for text in input]
+        embeddings: List[Optional[List[float]]] = [self.cache.get(key) for key in keys]
+
+        # Deduplicated misses, embedded together
+        missing: Dict[str, str] = {}
+        for key, text, embedding in zip(keys, input, embeddings):
+            if embedding is None:
+                missing.setdefault(key, text)
+        if missing:
+            computed = self.upstream(list(missing.values()))
+            fresh = {
+                key: [float(value) for value in embedding]
+                for key, embedding in zip(missing, computed)
+            }
+            for key, embedding in fresh.items():
+                self.cache.set(key, embedding)
+            embeddings = [
+                embedding if embedding is not None else fresh[key]
+                for key, embedding in zip(keys, embeddings)
+            ]
+        return embeddings
+
+    def stats(self) -> Dict[str, Any]:
+        return {"model": self.model_id, **self.cache.stats()}
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+# Which external services to replace with the deterministic local stand-ins below,
+# e.g. FAKE_BACKENDS=all or FAKE_BACKENDS=gemini,tavily
+FAKE_BACKEND_NAMES = ("gemini", "tavily", "chroma")
+
+# Default latencies, roughly what the real services show from a dev machine
+DEFAULT_LATENCIES = {
+    "gemini": "lognormal:1500,0.35",
+    "tavily": "lognormal:600,0.4",
+    "chroma": "lognormal:8,0.3"
+}
+
+def enabled_fakes() -> Set[str]:
+    names = {name.strip().lower() for name in os.getenv("FAKE_BACKENDS", "").split(",") if name.strip()}
+    if "all" in names:
+        return set(FAKE_BACKEND_NAMES)
+    return names & set(FAKE_BACKEND_NAMES)
+
+def use_fake(name: str) -> bool:
+    return name in enabled_fakes()
+
+def _stable_hash(*parts: Any) -> int:
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+class LatencyModel:
+    """Seeded latency distribution for a fake backend, parsed from a spec string.
+
+    Specs (milliseconds): ``fixed:<ms>``, ``uniform:<min>,<max>``, ``normal:<mean>,<sd>``
+    and ``lognormal:<median>,<sigma>``. The sequence of samples depends only on
+    FAKE_SEED and the backend name.
+    """
+
+    def __init__(self, spec: str, seed: Any = 0):
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        self.spec = spec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name: str) -> "LatencyModel":
+        spec = os.getenv(f"FAKE_{name.upper()}_LATENCY", DEFAULT_LATENCIES.get(name, "fixed:0"))
+        return cls(spec, seed=f"{os.getenv('FAKE_SEED', '0')}:{name}")
+
+    def sample(self) -> float:
+        """One latency in seconds"""
+        with self._lock:
+            if self.kind == "fixed":
+                ms = self.params[0]
+            elif self.kind == "uniform":
+                ms = self._rng.uniform(*self.params)
+            elif self.kind == "normal":
+                ms = self._rng.gauss(*self.params)
+            else:
+                ms = self._rng.lognormvariate(math.log(self.params[0]), self.params[1])
+        return max(0.0, ms) / 1000
+
+    async def wait(self):
+        await asyncio.sleep(self.sample())
+
+    def block(self):
+        # For stand-ins of synchronous SDKs: holds the calling thread like the real call does
+        time.sleep(self.sample())
+
+class FakeGenerationResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeGenerativeModel:
+    """Stand-in for genai.GenerativeModel: the same prompt always gets the same answer.
+
+    Prompts listing the reference patterns get one of them, drift prompts get the
+    JSON the drift agent parses, anything else gets a short numbered list.
+    """
+
+    DRIFT_LEVELS = ["Low", "Medium", "High"]
+    # Output instruction that only the drift prompt carries
+    DRIFT_MARKER = 'Return as JSON with: {"drift_level"'
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel.from_env("gemini")
+
+    async def generate_content_async(self, prompt: str, generation_config: Any = None) -> FakeGenerationResponse:
+        await self.latency.wait()
+        return FakeGenerationResponse(self.respond(prompt))
+
+    def respond(self, prompt: str) -> str:
+        seed = _stable_hash(prompt)
+        # Reference patterns are offered as **Name** in the pattern prompt. It also
+        # embeds the drift report, so this has to be checked before the drift marker
+        patterns = re.findall(r"\*\*(.+?)\*\*", prompt)
+        if patterns:
+            pattern = patterns[seed % len(patterns)]
+            return (f"Primary pattern: {pattern}. The OKR history shows this consistently "
+                    f"across recent months. Synthetic classification {seed % 10000:04d}.")
+
+        if self.DRIFT_MARKER in prompt:
+            return json.dumps({
+                "drift_level": self.DRIFT_LEVELS[seed % len(self.DRIFT_LEVELS)],
+                "flagged_transitions": [],
+                "reasoning": f"Synthetic assessment {seed % 10000:04d}."
+            })
+
+        return "\n".join(
+            f"{i}. Synthetic recommendation {(seed >> (8 * i)) % 1000:03d}" for i in range(1, 4)
+        )
+
+class FakeTavilyClient:
+    """Stand-in for TavilyClient with deterministic results per query"""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel.from_env("tavily")
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict[str, Any]:
+        self.latency.block()
+        seed = _stable_hash(query)
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"{query} - resource {i + 1}",
+                    "url": f"https://example.com/{seed % 100000}/{i + 1}",
+                    "content": f"Synthetic search result {i + 1} for {query}.",
+                    "score": round(1 - i * 0.1, 2)
+                }
+                for i in range(max_results)
+            ]
+        }
+
+class FakeCollection:
+    """In-memory stand-in for a Chroma collection.
+
+    Documents are ranked by word overlap with the query text (ties by id), so
+    results are deterministic without an embedding model.
+    """
+
+    def __init__(self, name: str, latency: LatencyModel):
+        self.name = name
+        self.latency = latency
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _words(text: str) -> Set[str]:
+        return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+    def count(self) -> int:
+        return len(self._docs)
+
+    def add(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict]] = None):
+        self.upsert(ids, documents, metadatas)
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict]] = None):
+        with self._lock:
+            for i, doc_id in enumerate(ids):
+                self._docs[doc_id] = {
+                    "document": documents[i],
+                    "metadata": dict((metadatas or [{}] * len(ids))[i] or {}),
+                    "words": self._words(documents[i])
+                }
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            for doc_id in ids:
+                self._docs.pop(doc_id, None)
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        with self._lock:
+            selected = [doc_id for doc_id in (ids or sorted(self._docs)) if doc_id in self._docs]
+            return {
+                "ids": selected,
+                "documents": [self._docs[doc_id]["document"] for doc_id in selected],
+                "metadatas": [dict(self._docs[doc_id]["metadata"]) for doc_id in selected]
+            }
+
+    def query(self, query_texts: List[str], n_results: int = 10, **kwargs) -> Dict[str, Any]:
+        self.latency.block()
+        response: Dict[str, List] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            docs = list(self._docs.items())
+        for text in query_texts:
+            words = self._words(text)
+            ranked = sorted(
+                docs,
+                key=lambda item: (-len(words & item[1]["words"]) / (len(words | item[1]["words"]) or 1), item[0])
+            )[:n_results]
+            response["ids"].append([doc_id for doc_id, _ in ranked])
+            response["documents"].append([doc["document"] for _, doc in ranked])
+            response["metadatas"].append([dict(doc["metadata"]) for _, doc in ranked])
+            response["distances"].append([
+                1 - len(words & doc["words"]) / (len(words | doc["words"]) or 1) for _, doc in ranked
+            ])
+        return response
+
+class FakeChromaClient:
+    """Stand-in for chromadb.PersistentClient holding FakeCollections in memory"""
+
+    def __init__(self, latency: Optional[LatencyModel] = None):
+        self.latency = latency or LatencyModel.from_env("chroma")
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def heartbeat(self) -> int:
+        return time.time_ns()
+
+    def get_collection(self, name: str, embedding_function: Any = None) -> FakeCollection:
+        if name not in self._collections:
+            raise ValueError(f"Collection {name} does not exist.")
+        return self._collections[name]
+
+    def get_or_create_collection(self, name: str, embedding_function: Any = None) -> FakeCollection:
+        return self._collections.setdefault(name, FakeCollection(name, self.latency))
@@ -0,0 +1,196 @@
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from pymongo import ReturnDocument
+import asyncio
+import os
+import socket
+import uuid
+
+from models.okr_model import analysis_jobs
+
+class AnalysisJobQueue:
+    """Durable job queue stored in MongoDB.
+
+    Workers claim a job by taking a lease on it and renew the lease while they run.
+    A job whose lease expires (its worker crashed or the process restarted) is
+    claimed again, up to ``max_attempts`` times. Finished jobs are removed by a TTL
+    index on ``finished_at``.
+    """
+
+    def __init__(self, collection=analysis_jobs, lease_seconds: Optional[int] = None,
+                 max_attempts: Optional[int] = None, result_ttl_seconds: Optional[int] = None):
+        self.collection = collection
+        self.lease_seconds = lease_seconds or int(os.getenv("JOB_LEASE_SECONDS", "300"))
+        self.max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.result_ttl_seconds = result_ttl_seconds or int(os.getenv("JOB_RESULT_TTL", str(7 * 24 * 3600)))
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", 1), ("created_at", 1)], name="status_created")
+        await self.collection.create_index("finished_at", expireAfterSeconds=self.result_ttl_seconds)
+
+    async def enqueue(self, payload: Dict[str, Any]) -> str:
+        now = datetime.utcnow()
+        job_id = uuid.uuid4().hex
+        await self.collection.insert_one({
+            "_id": job_id,
+            "status": "queued",
+            "payload": payload,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now
+        })
+        return job_id
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job: queued, or running with an expired lease"""
+        now = datetime.utcnow()
+        await self.collection.update_many(
+            {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {
+                "status": "failed",
+                "error": f"Lease expired after {self.max_attempts} attempts",
+                "finished_at": now,
+                "updated_at": now
+            }}
+        )
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "queued"},
+                    {"status": "running", "lease_expires_at": {"$lt": now}}
+                ],
+                "attempts": {"$lt": self.max_attempts}
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "worker": worker_id,
+                    "started_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def renew(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease; False means another worker has taken the job over"""
+        now = datetime.utcnow()
+        result = await self.collection.update_one(
+            {"_id": job_id, "status": "running", "worker": worker_id},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=self.lease_seconds), "updated_at": now}}
+        )
+        return result.modified_count == 1
+
+    async def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]):
+        await self._finish(job_id, worker_id, {"status": "completed", "result": result})
+
+    async def fail(self, job_id: str, worker_id: str, error: str):
+        await self._finish(job_id, worker_id, {"status": "failed", "error": error})
+
+    async def release(self, job_id: str, worker_id: str):
+        """Hand a job back to the queue without counting the attempt (worker shutting down)"""
+        await self.collection.update_one(
+            {"_id": job_id, "status": "running", "worker": worker_id},
+            {
+                "$set": {"status": "queued", "updated_at": datetime.utcnow()},
+                "$unset": {"worker": "", "lease_expires_at": ""},
+                "$inc": {"attempts": -1}
+            }
+        )
+
+    async def _finish(self, job_id: str, worker_id: str, fields: Dict[str, Any]):
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": job_id, "status": "running", "worker": worker_id},
+            {
+                "$set": {**fields, "finished_at": now, "updated_at": now},
+                "$unset": {"lease_expires_at": ""}
+            }
+        )
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": job_id})
+
+class JobWorkerPool:
+    """Runs ``handler(payload)`` for claimed jobs on a fixed number of asyncio workers"""
+
+    def __init__(self, queue: AnalysisJobQueue, handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 workers: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers if workers is not None else int(os.getenv("JOB_WORKERS", "2"))
+        self.poll_interval = poll_interval or float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def start(self):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = [
+            asyncio.create_task(self._run(f"{prefix}:{index}"))
+            for index in range(self.workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers now instead of at their next poll"""
+        self._wakeup.set()
+
+    async def _run(self, worker_id: str):
+        while True:
+            try:
+                job = await self.queue.claim(worker_id)
+            except Exception as e:
+                print(f"⚠️ Job claim failed on {worker_id}: {str(e)}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._execute(job, worker_id)
+
+    async def _execute(self, job: Dict[str, Any], worker_id: str):
+        handler = asyncio.ensure_future(self.handler(job["payload"]))
+        heartbeat = asyncio.create_task(self._heartbeat(job["_id"], worker_id, handler))
+        try:
+            result = await handler
+            await self.queue.complete(job["_id"], worker_id, result)
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                # Lease lost: the job belongs to another worker now, leave its state alone
+                print(f"⚠️ Lost the lease on job {job['_id']}, abandoned it on {worker_id}")
+                return
+            await asyncio.shield(self.queue.release(job["_id"], worker_id))
+            raise
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            print(f"⚠️ Job {job['_id']} failed: {detail}")
+            await self.queue.fail(job["_id"], worker_id, detail)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str, worker_id: str, handler: asyncio.Future):
+        """Renew the lease until cancelled; if it was lost, cancel the handler and return"""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                renewed = await self.queue.renew(job_id, worker_id)
+            except Exception as e:
+                # Transient: the lease may still be ours, the next renewal will tell
+                print(f"⚠️ Lease renewal failed for job {job_id}: {str(e)}")
+                continue
+            if not renewed:
+                handler.cancel()
+                return
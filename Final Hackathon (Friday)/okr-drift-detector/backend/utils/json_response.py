@@ -0,0 +1,25 @@
+from typing import Any
+from bson import ObjectId, Decimal128
+from fastapi.responses import JSONResponse
+import orjson
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dumps(data: Any) -> bytes:
+    """Single-pass JSON encoding of MongoDB documents.
+
+    ObjectIds become their hex string and datetimes ISO 8601 strings; naive
+    datetimes (as pymongo returns them) are marked UTC, matching json_util.
+    """
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS)
+
+class BSONJSONResponse(JSONResponse):
+    """JSONResponse that encodes BSON types directly, without a json_util round trip"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,110 @@
+from typing import Any, Dict, Tuple
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from pymongo import monitoring
+import math
+import threading
+
+# Latency buckets from fast cache/Mongo reads up to multi-second LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+NODE_DURATION = Histogram(
+    "okr_workflow_node_duration_seconds", "Duration of each LangGraph node",
+    ["node"], buckets=LATENCY_BUCKETS
+)
+NODE_FAILURES = Counter(
+    "okr_workflow_node_failures_total", "LangGraph node runs that raised", ["node"]
+)
+
+LLM_DURATION = Histogram(
+    "gemini_request_duration_seconds", "Latency of Gemini generate_content calls",
+    ["model", "outcome"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Histogram(
+    "gemini_request_tokens", "Prompt and output tokens per Gemini call",
+    ["model", "kind"], buckets=TOKEN_BUCKETS
+)
+LLM_CACHE_HITS = Counter(
+    "gemini_response_cache_hits_total", "Gemini calls answered from the response cache", ["model"]
+)
+
+CHROMA_DURATION = Histogram(
+    "chroma_query_duration_seconds", "Latency of Chroma collection queries",
+    ["collection"], buckets=LATENCY_BUCKETS
+)
+CHROMA_QUERY_TEXTS = Counter(
+    "chroma_query_texts_total", "Query texts sent to Chroma (a batched query counts each text)",
+    ["collection"]
+)
+
+RETRIEVAL_QUEUE_DEPTH = Gauge(
+    "retrieval_executor_queue_depth", "Vector queries waiting for a retrieval worker"
+)
+RETRIEVAL_IN_FLIGHT = Gauge(
+    "retrieval_executor_in_flight", "Vector queries running on retrieval workers"
+)
+RETRIEVAL_QUEUE_WAIT = Histogram(
+    "retrieval_executor_queue_wait_seconds", "Time vector queries waited for a retrieval worker",
+    buckets=LATENCY_BUCKETS
+)
+
+TAVILY_DURATION = Histogram(
+    "tavily_search_duration_seconds", "Latency of Tavily searches, excluding rate-limit waits",
+    ["outcome"], buckets=LATENCY_BUCKETS
+)
+TAVILY_CACHE_LOOKUPS = Counter(
+    "tavily_cache_lookups_total", "Tavily result cache lookups", ["result"]
+)
+
+MONGO_DURATION = Histogram(
+    "mongo_command_duration_seconds", "Latency of MongoDB commands as seen by the driver",
+    ["command", "collection", "outcome"], buckets=LATENCY_BUCKETS
+)
+
+def estimate_tokens(text: str) -> int:
+    # Rough count (4 chars per token) when the SDK returns no usage metadata
+    return math.ceil(len(text or "") / 4)
+
+def observe_llm_call(model: str, seconds: float, outcome: str, prompt: str, response: Any = None):
+    """Record one Gemini call; token counts come from usage_metadata when the SDK provides it"""
+    LLM_DURATION.labels(model, outcome).observe(seconds)
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        prompt_tokens = usage.prompt_token_count
+        output_tokens = usage.candidates_token_count
+    else:
+        prompt_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(response.text) if outcome == "ok" else 0
+    LLM_TOKENS.labels(model, "prompt").observe(prompt_tokens)
+    LLM_TOKENS.labels(model, "output").observe(output_tokens)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding MONGO_DURATION; register it on the client"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[Any, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            # getMore carries the cursor id under its command name
+            collection = event.command.get("collection")
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else ""
+            )
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
+
+    def _observe(self, event, outcome: str):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_DURATION.labels(event.command_name, collection, outcome).observe(event.duration_micros / 1e6)
+
+def render_metrics() -> Tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,52 @@
+from bson import json_util
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+import hashlib
+import os
+
+from models.okr_model import node_checkpoints
+
+class NodeCheckpointStore:
+    """Memoizes workflow node outputs in MongoDB, keyed by a hash of the node's inputs.
+
+    Rerunning an analysis where only the later inputs changed (e.g. quarterly_goal)
+    replays the unchanged nodes from here and resumes at the first node whose
+    inputs differ. Entries expire through a TTL index on ``created_at``.
+    """
+
+    def __init__(self, collection=node_checkpoints, ttl_seconds: Optional[int] = None):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds or int(os.getenv("NODE_CHECKPOINT_TTL", str(7 * 24 * 3600)))
+        self.enabled = os.getenv("NODE_CHECKPOINTS_ENABLED", "true").lower() == "true"
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+
+    @staticmethod
+    def make_key(node: str, state: Dict[str, Any], input_keys: Iterable[str]) -> str:
+        payload = json_util.dumps(
+            {"node": str(node), "inputs": {key: state.get(key) for key in input_keys}},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            doc = await self.collection.find_one({"_id": key}, {"output": 1})
+            return doc["output"] if doc else None
+        except Exception as e:
+            print(f"⚠️ Node checkpoint read failed: {str(e)}")
+            return None
+
+    async def save(self, key: str, node: str, output: Dict[str, Any], student_id: Optional[int] = None):
+        """Store a node output; ``student_id`` records the run that wrote it (for cleanup),
+        the entry itself is shared by any run with the same inputs"""
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {"_id": key, "node": str(node), "student_id": student_id, "output": output,
+                 "created_at": datetime.utcnow()},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"⚠️ Node checkpoint write failed: {str(e)}")
@@ -0,0 +1,68 @@
+from typing import Any, Dict, List, Mapping
+
+PILLARS = ["CLT", "CFC", "SCD", "IIPC", "SRI"]
+
+# Common focus areas for each pillar
+FOCUS_KEYWORDS = {
+    "CLT": ["genai", "course", "learning", "product management", "innovation"],
+    "CFC": ["hackathon", "project", "startup", "business model", "commercial"],
+    "SCD": ["leetcode", "competitive", "exam", "skill", "programming"],
+    "IIPC": ["linkedin", "network", "article", "professional", "connect"],
+    "SRI": ["community", "design thinking", "social", "responsibility", "impact"]
+}
+
+# Pillars that count towards goal readiness
+READINESS_PILLARS = ["CLT", "CFC", "SCD"]
+
+class PillarAnalyticsEngine:
+    """Pillar coverage, focus, trend and readiness for one student's OKR history.
+
+    Everything is computed in a single pass over the OKRs. A keyword counts once
+    per OKR whose title or description contains it, and ties for the focus go to
+    the keyword seen first.
+    """
+
+    def __init__(self, focus_keywords: Mapping[str, List[str]] = FOCUS_KEYWORDS):
+        # Plain substring checks: for a handful of short keywords per OKR they beat
+        # a combined regex several times over
+        self.focus_keywords = {pillar: list(focus_keywords.get(pillar, [])) for pillar in PILLARS}
+
+    def analyze(self, okrs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """{"pillar_analysis": ..., "readiness_score": ...} for one student's OKR history"""
+        counts = {pillar: 0 for pillar in PILLARS}
+        # Dicts keep insertion order, so max() below prefers the keyword seen first
+        focus_hits: Dict[str, Dict[str, int]] = {pillar: {} for pillar in PILLARS}
+
+        for okr in okrs:
+            pillar = okr.get("pillar")
+            if pillar not in counts:
+                continue
+            counts[pillar] += 1
+            keywords = self.focus_keywords[pillar]
+            if not keywords:
+                continue
+            text = (okr.get("title") or "").lower() + " " + (okr.get("description") or "").lower()
+            hits = focus_hits[pillar]
+            for keyword in keywords:
+                if keyword in text:
+                    hits[keyword] = hits.get(keyword, 0) + 1
+
+        total = len(okrs)
+        pillar_scores = {}
+        for pillar in PILLARS:
+            if total > 0:
+                score = min(100, int(counts[pillar] / total * 100 * 2))
+                hits = focus_hits[pillar]
+                pillar_scores[pillar] = {
+                    "score": score,
+                    "focus": max(hits.items(), key=lambda item: item[1])[0].title() if hits else "General",
+                    "completion": score,
+                    "trend": "up" if score > 60 else "down" if score < 40 else "stable"
+                }
+            else:
+                pillar_scores[pillar] = {"score": 0, "focus": "", "completion": 0, "trend": "stable"}
+
+        return {
+            "pillar_analysis": pillar_scores,
+            "readiness_score": min(100, sum(counts[pillar] for pillar in READINESS_PILLARS) * 10)
+        }
@@ -0,0 +1,117 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import math
+import os
+
+from utils.json_response import dumps as encode_json
+
+class PromptBuilder:
+    """Compact, token-budgeted serialization of OKR history and RAG context for prompts.
+
+    OKRs are reduced to the fields the agents reason about (month, pillar, title,
+    type, status, submission date, evidence kinds and a clipped description) and
+    written as single-line JSON. When the history exceeds ``history_token_budget``
+    the oldest OKRs lose their descriptions first, then are dropped entirely;
+    the most recent month is always kept. Token counts are estimated from length.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, history_token_budget: Optional[int] = None,
+                 context_token_budget: Optional[int] = None,
+                 description_chars: Optional[int] = None):
+        self.history_token_budget = history_token_budget or int(os.getenv("PROMPT_HISTORY_TOKEN_BUDGET", "3000"))
+        self.context_token_budget = context_token_budget or int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "2000"))
+        self.description_chars = description_chars or int(os.getenv("PROMPT_DESCRIPTION_CHARS", "200"))
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        return math.ceil(len(text) / cls.CHARS_PER_TOKEN)
+
+    @staticmethod
+    def dumps(data: Any) -> str:
+        return encode_json(data).decode()
+
+    def compact_okr(self, okr: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep only what the prompts use; raw activities become the kinds of evidence submitted"""
+        compact = {
+            "month": okr.get("monthId"),
+            "pillar": okr.get("pillar"),
+            "title": okr.get("title"),
+            "type": (okr.get("metadata") or {}).get("okrType"),
+            "status": okr.get("status"),
+            "submitted": self._format_date(okr.get("submittedOn")),
+            "evidence": sorted({
+                kind
+                for activity in okr.get("activities") or []
+                for kind, value in (activity or {}).items()
+                if value
+            }),
+            "description": self._clip(okr.get("description"))
+        }
+        return {key: value for key, value in compact.items() if value not in (None, "", [])}
+
+    def format_history(self, okrs: List[Dict[str, Any]]) -> str:
+        """One compact JSON line per OKR, newest month first, trimmed to the history budget"""
+        records = sorted(
+            (self.compact_okr(okr) for okr in okrs),
+            key=lambda record: record.get("month") or "",
+            reverse=True
+        )
+        lines = [self.dumps(record) for record in records]
+        used = sum(self.estimate_tokens(line) for line in lines)
+        newest_month = records[0].get("month") if records else None
+
+        # Lowest priority first: descriptions of the oldest OKRs
+        for index in reversed(range(len(records))):
+            if used <= self.history_token_budget:
+                break
+            if "description" in records[index]:
+                trimmed = self.dumps({k: v for k, v in records[index].items() if k != "description"})
+                used -= self.estimate_tokens(lines[index]) - self.estimate_tokens(trimmed)
+                lines[index] = trimmed
+
+        # Then whole OKRs, oldest first, never touching the most recent month
+        omitted = 0
+        while used > self.history_token_budget and lines and records[-1].get("month") != newest_month:
+            used -= self.estimate_tokens(lines.pop())
+            records.pop()
+            omitted += 1
+
+        if omitted:
+            lines.append(f"({omitted} older OKRs omitted)")
+        return "\n".join(lines)
+
+    def select_contexts(self, contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop repeated passages and keep contexts, in order, until the context budget is spent"""
+        selected = []
+        seen = set()
+        used = 0
+        for item in contexts:
+            content = item.get("content")
+            if content in seen:
+                continue
+            seen.add(content)
+            cost = self.estimate_tokens(f"{content}{item.get('metadata')}")
+            if selected and used + cost > self.context_token_budget:
+                break
+            selected.append(item)
+            used += cost
+        return selected
+
+    def _clip(self, text: Optional[str]) -> Optional[str]:
+        if not text or len(text) <= self.description_chars:
+            return text
+        return text[:self.description_chars].rstrip() + "…"
+
+    @staticmethod
+    def _format_date(value: Any) -> Optional[str]:
+        if isinstance(value, dict) and "$date" in value:
+            value = value["$date"]
+        if isinstance(value, (int, float)):
+            value = datetime.utcfromtimestamp(value / 1000)
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, str):
+            return value[:10]
+        return None
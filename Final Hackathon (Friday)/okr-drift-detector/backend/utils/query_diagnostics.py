@@ -0,0 +1,54 @@
+from typing import Any, Dict, Iterator, List, Optional
+
+def _winning_plans(node: Any) -> Iterator[Dict[str, Any]]:
+    """Yield every winningPlan in an explain document (aggregate explains nest them per stage)"""
+    if isinstance(node, dict):
+        if isinstance(node.get("winningPlan"), dict):
+            yield node["winningPlan"]
+        for key, value in node.items():
+            if key not in ("winningPlan", "rejectedPlans"):
+                yield from _winning_plans(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _winning_plans(item)
+
+def _plan_stages(node: Any, stages: List[Dict[str, Any]]):
+    if isinstance(node, dict):
+        if isinstance(node.get("stage"), str):
+            stages.append({"stage": node["stage"], "index": node.get("indexName")})
+        for value in node.values():
+            _plan_stages(value, stages)
+    elif isinstance(node, list):
+        for item in node:
+            _plan_stages(item, stages)
+
+def summarize_plan(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce an explain() result to its winning plan stages and the indexes they use"""
+    stages: List[Dict[str, Any]] = []
+    for plan in _winning_plans(explain):
+        _plan_stages(plan, stages)
+
+    names = [stage["stage"] for stage in stages]
+    return {
+        "stages": names,
+        "indexes": [stage["index"] for stage in stages if stage["index"]],
+        "collection_scan": "COLLSCAN" in names,
+        "in_memory_sort": "SORT" in names
+    }
+
+async def explain_find(collection, query: Dict[str, Any], sort: Optional[List] = None,
+                       limit: int = 0) -> Dict[str, Any]:
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    return summarize_plan(await cursor.explain())
+
+async def explain_aggregate(collection, pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+    explain = await collection.database.command(
+        "explain",
+        {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}},
+        verbosity="queryPlanner"
+    )
+    return summarize_plan(explain)
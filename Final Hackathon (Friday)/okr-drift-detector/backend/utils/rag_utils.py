@@ -1,20 +1,82 @@
 import google.generativeai as genai
 import chromadb
 from chromadb.utils import embedding_functions
+import hashlib
+import json
 import os
-from typing import List, Dict, Any
+import threading
+import time
+from typing import List, Dict, Any, Tuple
 from dotenv import load_dotenv
 from typing import Optional
+from utils.cache_store import LRUCache, PersistentTTLCache, TieredCache
+from utils.embedding_cache import CachedEmbeddingFunction
+from utils.fake_backends import FakeChromaClient, FakeGenerativeModel, use_fake
+from utils.retrieval_executor import RetrievalExecutor
+from utils import metrics
+
+# Metadata key holding each stored document's hash, see sync_pillar_data
+CONTENT_HASH_KEY = "content_hash"
+# generate_with_context returns this prefix instead of raising when Gemini fails
+LLM_ERROR_PREFIX = "Error generating response"
+
+# Chroma's client is synchronous; the async query methods run it on these workers
+_retrieval_executor = RetrievalExecutor(workers=int(os.getenv("RETRIEVAL_WORKERS", "4")))
+
+_shared_rag_utils: Optional["GeminiRAGUtils"] = None
+_shared_rag_lock = threading.Lock()
+
+def get_rag_utils() -> "GeminiRAGUtils":
+    """Return the process-wide GeminiRAGUtils, creating it on first use.
+
+    The Chroma client, embedding function and Gemini model handle are shared by
+    every agent, so they are only built (and the collections set up) once.
+    """
+    global _shared_rag_utils
+    if _shared_rag_utils is None:
+        with _shared_rag_lock:
+            if _shared_rag_utils is None:
+                _shared_rag_utils = GeminiRAGUtils()
+    return _shared_rag_utils
+
+def shutdown_retrieval():
+    """Stop the retrieval worker threads (app shutdown); the next query starts them again"""
+    _retrieval_executor.shutdown()
 
 class GeminiRAGUtils:
     def __init__(self):
         load_dotenv()
+        # FAKE_BACKENDS=gemini / chroma swap in local stand-ins (see utils/fake_backends.py)
+        fake_gemini = use_fake("gemini")
+        fake_chroma = use_fake("chroma")
+        
         api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        if not api_key and not (fake_gemini and fake_chroma):
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        if fake_gemini:
+            self.model_name = 'fake-gemini'
+            self.model = FakeGenerativeModel()
+        else:
+            genai.configure(api_key=api_key)
+            self.model_name = 'gemini-1.5-flash'
+            self.model = genai.GenerativeModel(self.model_name)
+        # e.g. GEMINI_TEMPERATURE=0 for deterministic, cache-friendly responses
+        self.generation_config: Dict[str, Any] = {}
+        if os.getenv("GEMINI_TEMPERATURE"):
+            self.generation_config["temperature"] = float(os.getenv("GEMINI_TEMPERATURE"))
+        self.response_cache = self._build_response_cache()
+        
+        # Content hash of the pillar knowledge base and contexts cached against it
+        self.kb_version: Optional[str] = None
+        self._context_cache: Dict[str, Tuple[Optional[str], List[Dict]]] = {}
+        
+        if fake_chroma:
+            # In-memory collections ranked by word overlap: no embedding model to load
+            self.chroma_client = FakeChromaClient()
+            self.embedding_function = None
+            self.setup_collections()
+            return
         
         # Initialize ChromaDB with auto-recovery
         self.chroma_path = os.getenv("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
@@ -26,6 +88,7 @@ class GeminiRAGUtils:
         except Exception as e:
             print(f"⚠️ Using default embeddings - {str(e)}")
             self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        self.embedding_function = self._wrap_embedding_function(self.embedding_function)
         
         self.setup_collections()
 
@@ -84,7 +147,10 @@ class GeminiRAGUtils:
             collection_name = f"okr_{pillar.lower()}"
             try:
                 # Try existing collection first
-                self.collections[pillar] = self.chroma_client.get_collection(collection_name)
+                self.collections[pillar] = self.chroma_client.get_collection(
+                    collection_name,
+                    embedding_function=self.embedding_function
+                )
             except Exception as e:
                 print(f"⚠️ Collection {collection_name} not found, creating new: {str(e)}")
                 try:
@@ -102,10 +168,92 @@ class GeminiRAGUtils:
     async def populate_collections_if_needed(self):
         """Populate collections that are empty after setup_collections"""
         if hasattr(self, '_collections_to_populate') and self._collections_to_populate:
-            await self.fetch_and_store_pillar_data()
+            await self.sync_pillar_data()
 
     async def fetch_and_store_pillar_data(self):
         """fetch web data for each pillar and store in ChromaDB"""
+        pillar_data_map = await self.load_pillar_data()
+        
+        for pillar, data in pillar_data_map.items():
+            if data:
+                documents = [item["content"] for item in data]
+                metadatas = [item["metadata"] for item in data]
+                ids = [self._document_id(pillar, item) for item in data]
+                
+                self.collections[pillar].add(
+                    documents=documents,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+        
+        self._set_kb_version(pillar_data_map)
+    
+    async def sync_pillar_data(self) -> Dict[str, int]:
+        """Bring the collections in line with the pillar data, embedding only what changed.
+
+        Ids come from a hash of the document text, so adding, removing or
+        reordering entries leaves the other documents' ids alone. Each stored
+        document also carries a hash of its content and metadata; documents whose
+        hash matches are left alone, new or changed ones are upserted and ids that
+        are no longer present are deleted. Safe to run on every start.
+        """
+        pillar_data_map = await self.load_pillar_data()
+        counts = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        
+        for pillar, data in pillar_data_map.items():
+            collection = self.collections[pillar]
+            stored = collection.get(include=["metadatas"])
+            stored_hashes = {
+                doc_id: (metadata or {}).get(CONTENT_HASH_KEY)
+                for doc_id, metadata in zip(stored["ids"], stored["metadatas"])
+            }
+            
+            current_ids = set()
+            upserts = {"ids": [], "documents": [], "metadatas": []}
+            for item in data:
+                doc_id = self._document_id(pillar, item)
+                if doc_id in current_ids:
+                    # Same text listed twice in a pillar: keep the first entry
+                    continue
+                current_ids.add(doc_id)
+                content_hash = self._document_hash(item)
+                if stored_hashes.get(doc_id) == content_hash:
+                    counts["unchanged"] += 1
+                    continue
+                counts["updated" if doc_id in stored_hashes else "added"] += 1
+                upserts["ids"].append(doc_id)
+                upserts["documents"].append(item["content"])
+                upserts["metadatas"].append({**item["metadata"], CONTENT_HASH_KEY: content_hash})
+            if upserts["ids"]:
+                collection.upsert(**upserts)
+            
+            removed = sorted(set(stored_hashes) - current_ids)
+            if removed:
+                collection.delete(ids=removed)
+                counts["deleted"] += len(removed)
+        
+        self._set_kb_version(pillar_data_map)
+        return counts
+    
+    @staticmethod
+    def _document_id(pillar: str, item: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(item["content"].encode("utf-8")).hexdigest()[:16]
+        return f"{pillar}_{digest}"
+    
+    @staticmethod
+    def _document_hash(item: Dict[str, Any]) -> str:
+        payload = json.dumps([item["content"], item["metadata"]], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    
+    def _set_kb_version(self, pillar_data_map: Dict[str, List[Dict]]):
+        # Collections changed: bump the version so cached contexts are recomputed
+        self.kb_version = hashlib.sha256(
+            json.dumps(pillar_data_map, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        self._context_cache.clear()
+    
+    async def load_pillar_data(self) -> Dict[str, List[Dict]]:
+        """Knowledge base documents for each pillar"""
         
         # CLT Pillar - Learning resources
         clt_data = [
@@ -180,26 +328,13 @@ class GeminiRAGUtils:
             }
         ]
         
-        # Store data in respective collections
-        pillar_data_map = {
+        return {
             "CLT": clt_data,
             "CFC": cfc_data,
             "SCD": scd_data,
             "IIPC": iipc_data,
             "SRI": sri_data
         }
-        
-        for pillar, data in pillar_data_map.items():
-            if data:
-                documents = [item["content"] for item in data]
-                metadatas = [item["metadata"] for item in data]
-                ids = [f"{pillar}_{i}" for i in range(len(documents))]
-                
-                self.collections[pillar].add(
-                    documents=documents,
-                    metadatas=metadatas,
-                    ids=ids
-                )
     
     async def fetch_yc_companies(self) -> List[Dict]:
         """fetch Y Combinator companies for CFC pillar"""
@@ -225,24 +360,129 @@ class GeminiRAGUtils:
     
     def query_pillar_knowledge(self, pillar: str, query: str, k: int = 5) -> List[Dict]:
         """Query specific pillar knowledge base"""
-        if pillar not in self.collections:
-            return []
-        
-        results = self.collections[pillar].query(
-            query_texts=[query],
-            n_results=k
-        )
+        return self.query_many([(pillar, query, k)])[0]
+
+    async def aquery_pillar_knowledge(self, pillar: str, query: str, k: int = 5) -> List[Dict]:
+        """query_pillar_knowledge on the retrieval executor, off the event loop"""
+        return (await self.aquery_many([(pillar, query, k)]))[0]
+
+    async def aget_cached_contexts(self, name: str, queries: List[Tuple[str, str, int]]) -> List[Dict]:
+        """Return the flattened contexts for a fixed set of queries, cached per kb_version.
+
+        Meant for static framework queries whose results only change when the
+        pillar collections do. The cache is dropped whenever the pillar data is (re)loaded.
+        """
+        cached = self._context_cache.get(name)
+        if cached and cached[0] == self.kb_version:
+            return cached[1]
         
-        return [
-            {
-                "content": doc,
-                "metadata": meta
+        # The version queried against, in case the knowledge base is resynced meanwhile
+        kb_version = self.kb_version
+        contexts = []
+        for context in await self.aquery_many(queries):
+            contexts.extend(context)
+        self._context_cache[name] = (kb_version, contexts)
+        return contexts
+
+    async def aquery_many(self, queries: List[Tuple[str, str, int]]) -> List[List[Dict]]:
+        """query_many on the retrieval executor, so concurrent analyses overlap their lookups"""
+        return await _retrieval_executor.run(self.query_many, queries)
+
+    def query_many(self, queries: List[Tuple[str, str, int]]) -> List[List[Dict]]:
+        """Run many (pillar, query, k) lookups with a single Chroma query per pillar.
+
+        Queries are grouped by collection and sent as one batch of query_texts, so
+        embedding and nearest-neighbour search happen in bulk. Results are returned
+        in the same order as ``queries``; unknown pillars yield an empty list.
+        """
+        results: List[List[Dict]] = [[] for _ in queries]
+        grouped: Dict[str, List[int]] = {}
+        for index, (pillar, _, _) in enumerate(queries):
+            if pillar in self.collections:
+                grouped.setdefault(pillar, []).append(index)
+
+        for pillar, indexes in grouped.items():
+            # Identical texts in one pillar only need to be embedded once
+            texts = list(dict.fromkeys(queries[i][1] for i in indexes))
+            n_results = max(queries[i][2] for i in indexes)
+
+            started = time.perf_counter()
+            response = self.collections[pillar].query(
+                query_texts=texts,
+                n_results=n_results
+            )
+            metrics.CHROMA_DURATION.labels(pillar).observe(time.perf_counter() - started)
+            metrics.CHROMA_QUERY_TEXTS.labels(pillar).inc(len(texts))
+
+            matches = {
+                text: [
+                    {
+                        "content": doc,
+                        "metadata": {k: v for k, v in meta.items() if k != CONTENT_HASH_KEY}
+                    }
+                    for doc, meta in zip(response['documents'][pos], response['metadatas'][pos])
+                ]
+                for pos, text in enumerate(texts)
             }
-            for doc, meta in zip(results['documents'][0], results['metadatas'][0])
-        ]
+            # Matches are ranked by distance, so the top k of a larger batch is exact
+            for i in indexes:
+                results[i] = matches[queries[i][1]][:queries[i][2]]
+
+        return results
     
-    async def generate_with_context(self, prompt: str, context: List[Dict] = None) -> Optional[str]:
-        """Generate response using Gemini with RAG context"""
+    def _build_response_cache(self) -> Optional[TieredCache]:
+        """Optional memoization for generate_with_context (LLM_CACHE_ENABLED=true).
+
+        Responses live in an in-memory LRU; setting LLM_CACHE_PATH adds a SQLite tier
+        that survives restarts.
+        """
+        if os.getenv("LLM_CACHE_ENABLED", "false").lower() != "true":
+            return None
+        
+        persistent = None
+        if os.getenv("LLM_CACHE_PATH"):
+            ttl = float(os.getenv("LLM_CACHE_TTL", "0"))
+            persistent = PersistentTTLCache(
+                path=os.getenv("LLM_CACHE_PATH"),
+                table="llm_responses",
+                ttl_seconds=ttl or None,
+                max_entries=int(os.getenv("LLM_CACHE_PERSISTENT_MAX_ENTRIES", "20000"))
+            )
+        return TieredCache(LRUCache(int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))), persistent)
+
+    def _wrap_embedding_function(self, upstream):
+        """Cache embeddings by text (EMBEDDING_CACHE_ENABLED, on by default).
+
+        Vectors live in an in-memory LRU backed by a SQLite tier at EMBEDDING_CACHE_PATH,
+        so query texts seen before, even in a previous run, are not embedded again.
+        """
+        if os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() != "true":
+            return upstream
+        
+        persistent = PersistentTTLCache(
+            path=os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite3"),
+            table="embeddings",
+            ttl_seconds=None,
+            max_entries=int(os.getenv("EMBEDDING_CACHE_PERSISTENT_MAX_ENTRIES", "50000"))
+        )
+        memory = LRUCache(int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "4096")))
+        return CachedEmbeddingFunction(upstream, TieredCache(memory, persistent))
+
+    def embedding_cache_stats(self) -> Dict[str, Any]:
+        if isinstance(self.embedding_function, CachedEmbeddingFunction):
+            return self.embedding_function.stats()
+        return {"enabled": False}
+
+    def response_cache_stats(self) -> Dict[str, Any]:
+        return self.response_cache.stats() if self.response_cache else {"enabled": False}
+
+    async def generate_with_context(self, prompt: str, context: List[Dict] = None,
+                                    use_cache: bool = True) -> Optional[str]:
+        """Generate response using Gemini with RAG context.
+
+        ``use_cache=False`` skips the response cache lookup (the fresh response
+        still replaces the cached one), for reruns that must reach the model.
+        """
         try:
             if context:
                 context_text = "\n".join([
@@ -253,14 +493,39 @@ class GeminiRAGUtils:
             else:
                 full_prompt = prompt
             
-            response = await self.model.generate_content_async(full_prompt)
+            # Content-addressed: identical model, prompt, context and config give the same key
+            cache = self.response_cache
+            cache_key = None
+            if cache:
+                cache_key = PersistentTTLCache.make_key(
+                    self.model_name, full_prompt, context or [], self.generation_config
+                )
+            if cache and use_cache:
+                cached = await cache.aget(cache_key)
+                if cached is not None:
+                    metrics.LLM_CACHE_HITS.labels(self.model_name).inc()
+                    return cached
+            
+            started = time.perf_counter()
+            try:
+                response = await self.model.generate_content_async(
+                    full_prompt,
+                    generation_config=self.generation_config or None
+                )
+            except Exception:
+                metrics.observe_llm_call(self.model_name, time.perf_counter() - started, "error", full_prompt)
+                raise
             
             if not response or not response.text:
+                metrics.observe_llm_call(self.model_name, time.perf_counter() - started, "empty", full_prompt)
                 print("Gemini returned empty response")
                 return "No response generated"
-                
+            metrics.observe_llm_call(self.model_name, time.perf_counter() - started, "ok", full_prompt, response)
+            
+            if cache:
+                await cache.aset(cache_key, response.text)
             return response.text
         except Exception as e:
             print(f"Error generating content: {str(e)}")
-            return f"Error generating response: {str(e)}"
+            return f"{LLM_ERROR_PREFIX}: {str(e)}"
         
\ No newline at end of file
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+import asyncio
+import threading
+import time
+
+from utils import metrics
+
+T = TypeVar("T")
+
+class RetrievalExecutor:
+    """Bounded thread pool for blocking vector store calls.
+
+    Chroma queries (embedding plus nearest-neighbour search) are synchronous, so
+    they run here instead of on the event loop; at most ``workers`` run at once
+    and the rest wait in the pool's queue. Queue depth, in-flight count and
+    queue wait are exported through utils.metrics. The pool is started on first
+    use and again after shutdown(), so one executor can outlive an app lifespan.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="retrieval")
+            return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        submitted = time.perf_counter()
+
+        def task():
+            metrics.RETRIEVAL_QUEUE_DEPTH.dec()
+            metrics.RETRIEVAL_QUEUE_WAIT.observe(time.perf_counter() - submitted)
+            metrics.RETRIEVAL_IN_FLIGHT.inc()
+            try:
+                return fn(*args)
+            finally:
+                metrics.RETRIEVAL_IN_FLIGHT.dec()
+
+        metrics.RETRIEVAL_QUEUE_DEPTH.inc()
+        future = self._pool().submit(task)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A query cancelled before it started (or by shutdown) never runs task(),
+            # so leave the queue here
+            if future.cancel():
+                metrics.RETRIEVAL_QUEUE_DEPTH.dec()
+            raise
+
+    def shutdown(self):
+        """Stop the worker threads; queued queries are cancelled, running ones finish"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
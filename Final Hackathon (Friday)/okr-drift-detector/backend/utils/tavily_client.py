@@ -1,39 +1,123 @@
 import os
 from tavily import TavilyClient
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from utils.cache_store import PersistentTTLCache
+from utils.fake_backends import FakeTavilyClient, use_fake
+from utils import metrics
+import asyncio
+import threading
 import time
 
 load_dotenv()
 
+class AsyncTokenBucket:
+    """Asyncio-native token bucket: refills `rate` tokens per second up to `capacity`.
+
+    Each caller reserves its token up front and sleeps on its own event loop until
+    the token is due, so callers are served in arrival order without blocking the
+    loop. The state is guarded by a thread lock rather than an asyncio.Lock, so one
+    bucket can be shared by every event loop and thread in the process.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Negative means reserved by earlier callers that are still waiting
+            self._tokens -= 1
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Hand the reservation back to the callers queued behind us
+                with self._lock:
+                    self._tokens += 1
+                raise
+
+# Shared by every TavilySearch in the process so the API limit holds globally
+_rate_limiter = AsyncTokenBucket(rate=float(os.getenv("TAVILY_RATE_LIMIT", "3")))  # requests per second
+# The Tavily SDK is synchronous; its calls run here instead of on the event loop
+_search_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TAVILY_MAX_WORKERS", "4")),
+    thread_name_prefix="tavily"
+)
+
+# Coaching queries are deterministic in (goal, pillar, okr_type, month), so results are reused
+_search_cache = (
+    PersistentTTLCache(
+        path=os.getenv("TAVILY_CACHE_PATH", "./tavily_cache.sqlite3"),
+        table="tavily_results",
+        ttl_seconds=float(os.getenv("TAVILY_CACHE_TTL", str(7 * 24 * 3600))),
+        max_entries=int(os.getenv("TAVILY_CACHE_MAX_ENTRIES", "5000"))
+    )
+    if os.getenv("TAVILY_CACHE_ENABLED", "true").lower() == "true" else None
+)
+
 class TavilySearch:
     def __init__(self):
-        api_key = os.getenv("TAVILY_API_KEY")
-        if not api_key:
-            raise ValueError("TAVILY_API_KEY not found in environment")
-        self.client = TavilyClient(api_key=api_key)
-        self.rate_limit = 3  # requests per second
-        self.last_request = 0
-    
-    async def search(self, query: str, max_results: int = 3) -> List[Dict[str, Any]]:
-        """Perform rate-limited web search"""
+        if use_fake("tavily"):
+            # Local stand-in (FAKE_BACKENDS=tavily); its results are cached apart from real ones
+            self.client = FakeTavilyClient()
+            self.cache_scope = ["fake"]
+        else:
+            api_key = os.getenv("TAVILY_API_KEY")
+            if not api_key:
+                raise ValueError("TAVILY_API_KEY not found in environment")
+            self.client = TavilyClient(api_key=api_key)
+            self.cache_scope = []
+        self.rate_limiter = _rate_limiter
+        self.cache = _search_cache
+
+    async def search(self, query: str, max_results: int = 3, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """Perform rate-limited web search, served from the result cache when possible.
+
+        ``use_cache=False`` (a forced refresh) always searches; the fresh results
+        still replace the cached ones.
+        """
+        cache_key = PersistentTTLCache.make_key(*self.cache_scope, query, max_results)
+        if self.cache and use_cache:
+            cached = await self.cache.aget(cache_key)
+            metrics.TAVILY_CACHE_LOOKUPS.labels("hit" if cached is not None else "miss").inc()
+            if cached is not None:
+                return cached
+
+        started = None
         try:
-            # Rate limiting
-            elapsed = time.time() - self.last_request
-            if elapsed < 1/self.rate_limit:
-                time.sleep((1/self.rate_limit) - elapsed)
-            
-            self.last_request = time.time()
-            
-            response = self.client.search(
+            await self.rate_limiter.acquire()
+
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(_search_executor, partial(
+                self.client.search,
                 query=query,
                 search_depth="basic",
                 include_answer=True,
                 include_raw_content=True,
                 max_results=max_results
-            )
-            
-            return response.get("results", [])
+            ))
+            metrics.TAVILY_DURATION.labels("ok").observe(time.perf_counter() - started)
+
+            results = response.get("results", [])
+            if self.cache:
+                await self.cache.aset(cache_key, results)
+            return results
         except Exception as e:
+            if started is not None:
+                metrics.TAVILY_DURATION.labels("error").observe(time.perf_counter() - started)
             print(f"Tavily search error: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats() if self.cache else {"enabled": False}